@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Content-addressed запишување на артефактите во kb/processed
+Секој излез се адресира по SHA-256 на содржината: manifest.json ги мапира
+логичките имиња (пр. "lon_codelists.json") во хеш и големина. Ако новата
+содржина има ист хеш како постоечкиот фајл, фајлот воопшто не се допира
+(mtime останува ист), па KnowledgeBaseSeeder, Docker слоевите и build_kb.py
+можат да кешираат по хеш низ повеќе градења.
+
+Полињата што се менуваат при секое извршување (пр. metadata.generated) се
+наведуваат како volatile - не влегуваат во хешот на содржината, па
+промена само во нив не предизвикува ново запишување.
+
+Употреба:
+    from artifact_store import write_json
+    write_json(PROCESSED_DIR / "lon_codelists.json", data)
+"""
+
+import copy
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+PROCESSED_DIR = Path(__file__).parent.parent / "processed"
+MANIFEST_FILE = PROCESSED_DIR / "manifest.json"
+
+# Заклучување на манифестот (генераторите во build_kb.py работат паралелно)
+LOCK_TIMEOUT = 30.0
+LOCK_POLL = 0.01
+# Lock без PID (сопственикот паднал пред да го запише) постар од ова е заостанат
+LOCK_STALE_AGE = 5.0
+
+
+def content_hash(payload):
+    return hashlib.sha256(payload).hexdigest()
+
+
+def serialize(data):
+    """Ист формат како json.dump(..., ensure_ascii=False, indent=2) во генераторите"""
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _without(data, volatile):
+    """Копија од data без volatile полињата (патеки одделени со точка)"""
+    if not volatile:
+        return data
+    data = copy.deepcopy(data)
+    for path in volatile:
+        *parents, key = path.split(".")
+        node = data
+        for parent in parents:
+            node = node.get(parent) if isinstance(node, dict) else None
+        if isinstance(node, dict):
+            node.pop(key, None)
+    return data
+
+# ==============================================================================
+# Манифест
+# ==============================================================================
+
+class _ManifestLock:
+    """
+    Едноставен меѓупроцесен lock преку ексклузивно креирање на фајл.
+    Фајлот го содржи PID-от на сопственикот; lock на процес што веќе не
+    постои, или lock без PID постар од LOCK_STALE_AGE, се отстранува, а жив
+    сопственик по LOCK_TIMEOUT е грешка.
+    """
+
+    def __init__(self, manifest_file):
+        self.lock_file = manifest_file.with_name(manifest_file.name + ".lock")
+
+    def __enter__(self):
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while True:
+            try:
+                fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                holder = self._holder()
+                if holder is not None and not _process_alive(holder):
+                    # Заостанат lock од прекинат процес
+                    self._break(holder)
+                    continue
+                if holder is None and self._break_unowned():
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Манифестот е заклучен подолго од {LOCK_TIMEOUT:.0f}s "
+                                       f"(процес {holder or '?'}): {self.lock_file}")
+                time.sleep(LOCK_POLL)
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(str(os.getpid()))
+            return self
+
+    def __exit__(self, *exc):
+        self.lock_file.unlink(missing_ok=True)
+
+    def _holder(self):
+        """PID од lock фајлот, или None ако уште не е запишан"""
+        try:
+            return int(self.lock_file.read_text().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _break(self, holder):
+        # Бриши само ако lock-от сè уште е на истиот (мртов) процес
+        if self._holder() == holder:
+            self.lock_file.unlink(missing_ok=True)
+
+    def _break_unowned(self):
+        """Отстрани празен/нечитлив lock постар од LOCK_STALE_AGE; враќа дали е отстранет"""
+        try:
+            age = time.time() - self.lock_file.stat().st_mtime
+        except FileNotFoundError:
+            return True
+        if age < LOCK_STALE_AGE or self._holder() is not None:
+            return False
+        self.lock_file.unlink(missing_ok=True)
+        return True
+
+
+def _process_alive(pid):
+    if os.name == "nt":
+        return _windows_process_alive(pid)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _windows_process_alive(pid):
+    # os.kill на Windows го прекинува процесот, па се прашува kernel32
+    import ctypes
+    from ctypes import wintypes
+
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    ERROR_ACCESS_DENIED = 5
+    STILL_ACTIVE = 259
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    kernel32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+    kernel32.GetExitCodeProcess.argtypes = (wintypes.HANDLE, ctypes.POINTER(wintypes.DWORD))
+    kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+
+    handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        # Без пристап процесот постои; секоја друга грешка значи дека го нема
+        return ctypes.get_last_error() == ERROR_ACCESS_DENIED
+    try:
+        exit_code = wintypes.DWORD()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+            return True
+        return exit_code.value == STILL_ACTIVE
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def load_manifest(manifest_file=MANIFEST_FILE):
+    """{логичко име: {"sha256", "size"[, "content"]}}"""
+    if not Path(manifest_file).exists():
+        return {}
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _record(manifest_file, name, entry):
+    manifest_file = Path(manifest_file)
+    with _ManifestLock(manifest_file):
+        manifest = load_manifest(manifest_file)
+        if manifest.get(name) == entry:
+            return
+        manifest[name] = entry
+        _atomic_write(manifest_file, serialize(dict(sorted(manifest.items()))))
+
+
+def _atomic_write(path, payload):
+    tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_file, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_file, path)
+
+# ==============================================================================
+# Запишување
+# ==============================================================================
+
+def write_json(path, data, volatile=(), manifest_file=MANIFEST_FILE):
+    """
+    Запиши JSON артефакт само ако содржината е сменета.
+    volatile - патеки (пр. "metadata.generated") што не влегуваат во хешот.
+    Враќа True ако фајлот е запишан, False ако е прескокнат.
+    """
+    path = Path(path)
+    payload = serialize(data)
+    content = content_hash(serialize(_without(data, volatile))) if volatile else content_hash(payload)
+
+    written = True
+    if path.exists():
+        existing = path.read_bytes()
+        if volatile:
+            try:
+                existing_content = content_hash(serialize(_without(json.loads(existing), volatile)))
+            except ValueError:
+                existing_content = None
+        else:
+            existing_content = content_hash(existing)
+        if existing_content == content:
+            payload = existing
+            written = False
+
+    if written:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(path, payload)
+
+    entry = {"sha256": content_hash(payload), "size": len(payload)}
+    if volatile:
+        entry["content"] = content
+    _record(manifest_file, path.name, entry)
+    return written
+
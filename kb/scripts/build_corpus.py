@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script за градење на текстуален корпус од сите документи во kb/Raw_Files
+Секоја страница се извлекува (паралелно, преку кешот во pdf_text.py),
+се нормализира (празни места, кирилица, прекинати зборови) и се запишува
+како една NDJSON линија: {"source", "sha256", "page" (од 1), "text"}.
+Ако извршувањето се прекине, следното продолжува од последната страница.
+
+Извор: kb/Raw_Files/*.pdf, *.docx
+Output: kb/processed/corpus_pages.ndjson
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import unicodedata
+import zipfile
+from pathlib import Path
+from xml.etree import ElementTree
+
+from pdf_text import RAW_FILES_DIR, PdfTextCache, file_hash
+
+OUTPUT_FILE = Path(__file__).parent.parent / "processed" / "corpus_pages.ndjson"
+
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# ==============================================================================
+# Нормализација на текст
+# ==============================================================================
+
+# NBSP, тесни и типографски празни места → обично празно место
+_SPACES = re.compile(r"[\t\u00a0\u2000-\u200a\u202f\u205f\u3000]+")
+# Зборови прекинати со цртичка на крај од ред: "прави-\nлник" → "правилник"
+# (само ако продолжението е мала буква, за да останат сложенките со голема)
+_HYPHENATION = re.compile(r"(\w)[-\u00ad\u2010]\s*\n\s*([a-zа-яѐ-џ])")
+_MULTI_SPACE = re.compile(r" {2,}")
+_MULTI_NEWLINE = re.compile(r"\n{3,}")
+
+def normalize_text(text):
+    """Нормализирај текст извлечен од PDF/Word за RAG"""
+    text = unicodedata.normalize("NFC", text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = _SPACES.sub(" ", text)
+    text = _HYPHENATION.sub(r"\1\2", text)
+    text = text.replace("\u00ad", "")
+    text = _MULTI_SPACE.sub(" ", text)
+    text = "\n".join(line.strip() for line in text.split("\n"))
+    text = _MULTI_NEWLINE.sub("\n\n", text)
+    return text.strip()
+
+# ==============================================================================
+# Читање на извори
+# ==============================================================================
+
+def _docx_paragraphs(container):
+    """
+    Пасуси од тело/ќелија по редослед, секој точно еднаш: само директните
+    пасуси, ќелиите на табелите и содржината на контролите (sdt). Пасусите
+    во текстуални полиња се дел од текстот на пасусот што ги содржи.
+    """
+    for child in container:
+        if child.tag == f"{WORD_NS}p":
+            yield child
+        elif child.tag == f"{WORD_NS}tbl":
+            for row in child.iterfind(f"{WORD_NS}tr"):
+                for cell in row.iterfind(f"{WORD_NS}tc"):
+                    yield from _docx_paragraphs(cell)
+        elif child.tag == f"{WORD_NS}sdt":
+            content = child.find(f"{WORD_NS}sdtContent")
+            if content is not None:
+                yield from _docx_paragraphs(content)
+
+def docx_pages(path):
+    """Текст од .docx по страници (одделени со рачен прекин на страница)"""
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read("word/document.xml"))
+
+    body = root.find(f"{WORD_NS}body")
+    pages = [[]]
+    for paragraph in _docx_paragraphs(body if body is not None else root):
+        parts = []
+        for node in paragraph.iter():
+            if node.tag == f"{WORD_NS}t" and node.text:
+                parts.append(node.text)
+            elif node.tag == f"{WORD_NS}tab":
+                parts.append(" ")
+            elif node.tag == f"{WORD_NS}br" and node.get(f"{WORD_NS}type") == "page":
+                pages[-1].append("".join(parts))
+                parts = []
+                pages.append([])
+        pages[-1].append("".join(parts))
+
+    return {page_num: "\n".join(paragraphs) for page_num, paragraphs in enumerate(pages)}
+
+def iter_sources(raw_dir=RAW_FILES_DIR):
+    """Документи за корпусот; .doc (бинарен Word) не е поддржан без надворешна алатка"""
+    for path in sorted(Path(raw_dir).iterdir()):
+        suffix = path.suffix.lower()
+        if suffix in (".pdf", ".docx"):
+            yield path
+        elif suffix == ".doc":
+            print(f"  ⚠️  Прескокнат (стар .doc формат, конвертирај во .docx): {path.name}")
+
+# ==============================================================================
+# Продолжување по прекин
+# ==============================================================================
+
+def _truncate_partial_line(path):
+    """Отстрани недовршена последна линија (прекин при запишување)"""
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        position = size
+        while position > 0:
+            step = min(65536, position)
+            position -= step
+            f.seek(position)
+            block = f.read(step)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                f.truncate(position + newline + 1)
+                return
+        f.truncate(0)
+
+def load_progress(output_file):
+    """Веќе запишани страници: {source: (sha256, {индекс на страница од 0, ...})}"""
+    progress = {}
+    if not output_file.exists():
+        return progress
+
+    _truncate_partial_line(output_file)
+    for record in iter_corpus(output_file):
+        digest, pages = progress.setdefault(record["source"], (record["sha256"], set()))
+        if digest == record["sha256"]:
+            pages.add(record["page"] - 1)
+    return progress
+
+def drop_sources(output_file, sources):
+    """Преработи го излезот без записите на изменетите извори"""
+    tmp_file = output_file.with_name(output_file.name + ".tmp")
+    with open(output_file, 'r', encoding='utf-8') as src, open(tmp_file, 'w', encoding='utf-8') as dst:
+        for line in src:
+            if json.loads(line)["source"] not in sources:
+                dst.write(line)
+    os.replace(tmp_file, output_file)
+
+def iter_corpus(path=OUTPUT_FILE):
+    """Генератор кој ги чита записите од корпусот еден по еден"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+# ==============================================================================
+# Градење
+# ==============================================================================
+
+def build_corpus(output_file=OUTPUT_FILE, workers=None, raw_dir=RAW_FILES_DIR):
+    """Изгради/продолжи го корпусот; враќа (нови страници, прескокнати страници)"""
+    output_file = Path(output_file)
+    output_file.parent.mkdir(exist_ok=True)
+
+    sources = list(iter_sources(raw_dir))
+    digests = {path.name: file_hash(path) for path in sources}
+
+    progress = load_progress(output_file)
+    changed = {name for name, (digest, _) in progress.items() if digests.get(name) != digest}
+    if changed:
+        print(f"  ♻️  Изменети/отстранети извори, се преработуваат: {', '.join(sorted(changed))}")
+        drop_sources(output_file, changed)
+        for name in changed:
+            del progress[name]
+
+    written = 0
+    resumed = 0
+    with open(output_file, 'a', encoding='utf-8') as out:
+        for path in sources:
+            done = progress.get(path.name, (None, set()))[1]
+
+            if path.suffix.lower() == ".pdf":
+                cache = PdfTextCache(path)
+                pending = [page_num for page_num in range(cache.page_count) if page_num not in done]
+                # Страниците се запишуваат штом се извлечени, па прекин не ја губи работата
+                texts = cache.iter_extract(pending, workers)
+            else:
+                texts = sorted((page_num, text) for page_num, text in docx_pages(path).items()
+                               if page_num not in done)
+
+            resumed += len(done)
+            new_pages = 0
+            for page_num, text in texts:
+                out.write(json.dumps({
+                    "source": path.name,
+                    "sha256": digests[path.name],
+                    "page": page_num + 1,
+                    "text": normalize_text(text)
+                }, ensure_ascii=False))
+                out.write("\n")
+                out.flush()
+                written += 1
+                new_pages += 1
+
+            print(f"  ✅ {path.name}: {new_pages} нови страници, {len(done)} веќе обработени")
+
+    return written, resumed
+
+def main():
+    parser = argparse.ArgumentParser(description="Градење текстуален корпус од kb/Raw_Files")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="број на процеси за PDF екстракција (стандардно: сите јадра)")
+    parser.add_argument("--output", type=Path, default=OUTPUT_FILE,
+                        help="патека до NDJSON корпусот")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("📚 ГРАДЕЊЕ НА КОРПУС ОД RAW_FILES")
+    print("=" * 80)
+
+    written, resumed = build_corpus(args.output, args.workers)
+
+    print(f"\n✅ Запишани нови страници: {written}")
+    print(f"⏭️  Продолжено (веќе обработени): {resumed}")
+    print(f"📦 Фајл: {args.output}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Грешка: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Оркестратор за градење на целата база на знаење (kb/processed)
+Секоја фаза ги декларира влезовите (Raw_Files, други processed фајлови) и
+излезите. Зависностите се изведуваат од тоа кој излез е чиј влез, а
+скриптите и локалните модули што ги увезуваат автоматски се додаваат
+како влезови. Фаза се прескокнува ако хешовите на влезовите и излезите
+се исти како при последното успешно градење; независните фази се
+извршуваат паралелно.
+
+Состојба: kb/.cache/build_state.json, логови: kb/.cache/build_logs/<фаза>.log
+Употреба: python kb/scripts/build_kb.py [--workers N] [--force] [--only фаза ...] [--dry-run]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).parent
+KB_DIR = SCRIPTS_DIR.parent
+RAW_FILES_DIR = KB_DIR / "Raw_Files"
+PROCESSED_DIR = KB_DIR / "processed"
+CACHE_DIR = KB_DIR / ".cache"
+STATE_FILE = CACHE_DIR / "build_state.json"
+LOG_DIR = CACHE_DIR / "build_logs"
+
+# ==============================================================================
+# Фази
+# ==============================================================================
+
+STAGES = [
+    {
+        "name": "taric",
+        "script": "import_taric.py",
+        "inputs": [RAW_FILES_DIR / "TARIC.xlsx"],
+        "outputs": [PROCESSED_DIR / "taric_data.json", PROCESSED_DIR / "taric_data.bin"]
+    },
+    {
+        "name": "regulations",
+        "script": "import_regulations.py",
+        # taric_data.bin: споените тарифни ознаки се проверуваат со TARIC табелата
+        "inputs": [RAW_FILES_DIR / "Spisok na Regulativi KN 15.xlsx", PROCESSED_DIR / "taric_data.bin"],
+        "outputs": [
+            PROCESSED_DIR / "regulations_data.json",
+            PROCESSED_DIR / "regulations_prefix_index.json",
+            PROCESSED_DIR / "regulations_search_index.json"
+        ]
+    },
+    {
+        "name": "tariff_regulations",
+        "script": "build_tariff_regulations.py",
+        "inputs": [PROCESSED_DIR / "taric_data.bin", PROCESSED_DIR / "regulations_data.json"],
+        "outputs": [PROCESSED_DIR / "tariff_regulations_index.json"]
+    },
+    {
+        "name": "countries_offices",
+        "script": "extract_countries_and_offices.py",
+        # Скриптата ги запишува рачно внесените листи; PDF-от не се чита
+        "inputs": [],
+        "outputs": [PROCESSED_DIR / "countries_box15a.json", PROCESSED_DIR / "customs_offices_box29.json"]
+    },
+    {
+        "name": "iso",
+        "script": "generate_iso_data.py",
+        "inputs": [],
+        "outputs": [PROCESSED_DIR / "currencies_box22_iso.json", PROCESSED_DIR / "countries_box15a_iso.json"]
+    },
+    {
+        "name": "codelists",
+        "script": "create_codelists.py",
+        "inputs": [],
+        "outputs": [PROCESSED_DIR / "lon_codelists.json"]
+    },
+    {
+        "name": "codelists_complete",
+        "script": "create_complete_codelists.py",
+        "inputs": [],
+        "outputs": [PROCESSED_DIR / "lon_codelists_complete.json"]
+    },
+    {
+        "name": "validation_rules",
+        "script": "create_validation_rules.py",
+        "inputs": [],
+        "outputs": [PROCESSED_DIR / "lon_validation_rules.json", PROCESSED_DIR / "lon_validation_index.json"]
+    },
+    {
+        "name": "corpus",
+        "script": "build_corpus.py",
+        "inputs": [RAW_FILES_DIR],
+        "outputs": [PROCESSED_DIR / "corpus_pages.ndjson"]
+    },
+    {
+        "name": "chunks",
+        "script": "chunk_kb.py",
+        "inputs": [PROCESSED_DIR / "regulations_data.json", PROCESSED_DIR / "corpus_pages.ndjson"],
+        "outputs": [PROCESSED_DIR / "kb_chunks.ndjson"]
+    },
+    {
+        "name": "embeddings",
+        "script": "embed_kb.py",
+        "inputs": [PROCESSED_DIR / "kb_chunks.ndjson"],
+        "outputs": [
+            PROCESSED_DIR / "kb_embeddings.f32",
+            PROCESSED_DIR / "kb_embeddings.json",
+            PROCESSED_DIR / "embedding_model_local.npz"
+        ]
+    },
+    {
+        "name": "vectors",
+        "script": "vector_store.py",
+        "inputs": [PROCESSED_DIR / "kb_embeddings.f32", PROCESSED_DIR / "kb_embeddings.json"],
+        "outputs": [PROCESSED_DIR / "kb_vectors.bin", PROCESSED_DIR / "kb_vectors.json"]
+    },
+]
+
+# ==============================================================================
+# Хеширање (со кеш по големина и mtime, за брз no-op)
+# ==============================================================================
+
+_IMPORT = re.compile(r"^\s*(?:from\s+(\w+)\s+import|import\s+(\w+))", re.MULTILINE)
+
+
+def local_modules(script):
+    """Скриптата и сите локални модули од kb/scripts што ги увезува (транзитивно)"""
+    seen = set()
+    pending = [SCRIPTS_DIR / script]
+    while pending:
+        path = pending.pop()
+        if path in seen or not path.exists():
+            continue
+        seen.add(path)
+        for match in _IMPORT.finditer(path.read_text(encoding='utf-8')):
+            module = SCRIPTS_DIR / f"{match.group(1) or match.group(2)}.py"
+            if module.exists():
+                pending.append(module)
+    return sorted(seen)
+
+
+def expand(paths):
+    """Директориумите се заменуваат со сите фајлови во нив"""
+    files = []
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*") if p.is_file()))
+        else:
+            files.append(path)
+    return files
+
+
+class Hasher:
+    """SHA-256 на фајлови; повторно се хешира само ако големината или mtime се сменети"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def __call__(self, path):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        key = str(path.relative_to(KB_DIR))
+        cached = self.cache.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self.cache[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def snapshot(self, paths):
+        return {str(path.relative_to(KB_DIR)): self(path) for path in paths}
+
+# ==============================================================================
+# Градење
+# ==============================================================================
+
+def load_state():
+    if STATE_FILE.exists():
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {"files": {}, "stages": {}}
+
+
+def save_state(state):
+    CACHE_DIR.mkdir(exist_ok=True)
+    tmp_file = STATE_FILE.with_name(STATE_FILE.name + ".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, STATE_FILE)
+
+
+def dependencies(stages):
+    """{фаза: {фази чии излези ги користи}}"""
+    producers = {}
+    for stage in stages:
+        for output in stage["outputs"]:
+            producers[Path(output)] = stage["name"]
+    return {
+        stage["name"]: {producers[Path(path)] for path in stage["inputs"] if Path(path) in producers}
+        for stage in stages
+    }
+
+
+def check_cycles(depends):
+    """ValueError ако зависностите имаат циклус (фазите во него никогаш не би се извршиле)"""
+    remaining = {name: set(deps) for name, deps in depends.items()}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps & remaining.keys()]
+        if not ready:
+            raise ValueError(f"Циклус во зависностите: {', '.join(sorted(remaining))}")
+        for name in ready:
+            del remaining[name]
+
+
+def stage_inputs(stage):
+    return expand(stage["inputs"]) + local_modules(stage["script"])
+
+
+def is_fresh(stage, state, hasher):
+    """Дали влезовите и излезите се исти како при последното успешно градење"""
+    previous = state["stages"].get(stage["name"])
+    if previous is None:
+        return False
+    if previous["inputs"] != hasher.snapshot(stage_inputs(stage)):
+        return False
+    outputs = hasher.snapshot(expand(stage["outputs"]))
+    return None not in outputs.values() and previous["outputs"] == outputs
+
+
+def run_stage(stage):
+    """Изврши ја скриптата како посебен процес; враќа (успех, секунди, лог)"""
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    log_file = LOG_DIR / f"{stage['name']}.log"
+    started = time.perf_counter()
+    with open(log_file, 'w', encoding='utf-8') as log:
+        result = subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / stage["script"])],
+            cwd=KB_DIR.parent, stdout=log, stderr=subprocess.STDOUT,
+            env={**os.environ, "PYTHONIOENCODING": "utf-8"}
+        )
+    return result.returncode == 0, time.perf_counter() - started, log_file
+
+
+def build(stages=STAGES, workers=None, force=False, dry_run=False):
+    """Изгради ги фазите по зависности; враќа {фаза: статус}"""
+    state = load_state()
+    hasher = Hasher(state["files"])
+    depends = dependencies(stages)
+    by_name = {stage["name"]: stage for stage in stages}
+    for name in depends:
+        depends[name] &= by_name.keys()
+    check_cycles(depends)
+
+    status = {}
+    running = {}
+    workers = workers or os.cpu_count() or 1
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while len(status) < len(stages):
+            for name, stage in by_name.items():
+                if name in status or name in running:
+                    continue
+                if any(status.get(dep) == "failed" or status.get(dep) == "blocked" for dep in depends[name]):
+                    status[name] = "blocked"
+                    print(f"  ⛔ {name}: прескокнато (неуспешна зависност)")
+                    continue
+                if not all(dep in status for dep in depends[name]):
+                    continue
+                # Во --dry-run излезите на застарената зависност уште не се променети,
+                # па is_fresh не би го видел тоа: фазата е застарена заедно со неа
+                upstream_stale = any(status[dep] == "stale" for dep in depends[name])
+                if not force and not upstream_stale and is_fresh(stage, state, hasher):
+                    status[name] = "fresh"
+                    print(f"  ⏭️  {name}: непроменето")
+                    continue
+                if dry_run:
+                    status[name] = "stale"
+                    print(f"  🔄 {name}: ќе се изгради")
+                    continue
+                print(f"  ▶️  {name}: {stage['script']}")
+                running[name] = pool.submit(run_stage, stage)
+
+            if not running:
+                if len(status) < len(stages):
+                    raise RuntimeError(f"Нема фаза за извршување: {', '.join(sorted(by_name.keys() - status.keys()))}")
+                continue
+
+            done, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+            for name in [name for name, future in running.items() if future in done]:
+                ok, seconds, log_file = running.pop(name).result()
+                stage = by_name[name]
+                if ok:
+                    state["stages"][name] = {
+                        "inputs": hasher.snapshot(stage_inputs(stage)),
+                        "outputs": hasher.snapshot(expand(stage["outputs"]))
+                    }
+                    status[name] = "built"
+                    print(f"  ✅ {name}: {seconds:.1f} с")
+                else:
+                    state["stages"].pop(name, None)
+                    status[name] = "failed"
+                    print(f"  ❌ {name}: грешка по {seconds:.1f} с (лог: {log_file})")
+
+    if not dry_run:
+        save_state(state)
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Градење на kb/processed по зависности")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="паралелни фази (стандардно: сите јадра)")
+    parser.add_argument("--force", action="store_true", help="изгради ги сите фази одново")
+    parser.add_argument("--only", nargs="+", metavar="ФАЗА",
+                        help=f"само овие фази ({', '.join(stage['name'] for stage in STAGES)})")
+    parser.add_argument("--dry-run", action="store_true", help="само прикажи што би се градело")
+    args = parser.parse_args()
+
+    stages = STAGES
+    if args.only:
+        unknown = set(args.only) - {stage["name"] for stage in STAGES}
+        if unknown:
+            parser.error(f"Непознати фази: {', '.join(sorted(unknown))}")
+        stages = [stage for stage in STAGES if stage["name"] in args.only]
+
+    print("=" * 80)
+    print("🏗️  ГРАДЕЊЕ НА БАЗАТА НА ЗНАЕЊЕ")
+    print("=" * 80)
+
+    started = time.perf_counter()
+    status = build(stages, args.workers, args.force, args.dry_run)
+    elapsed = time.perf_counter() - started
+
+    counts = {}
+    for value in status.values():
+        counts[value] = counts.get(value, 0) + 1
+    print(f"\n📊 {', '.join(f'{key}: {count}' for key, count in sorted(counts.items()))} ({elapsed:.2f} с)")
+
+    if counts.get("failed") or counts.get("blocked"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
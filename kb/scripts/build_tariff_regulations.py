@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Script за спојување на тарифни ознаки со регулативи (обратен индекс)
+Секоја тарифна ознака од регулативите се разрешува по префикс против
+TARIC табелата, па за секоја 10-цифрена ознака се добиваат CELEX броевите
+на обврзувачките распоредувања што важат за неа.
+
+Извор: kb/processed/taric_data.bin (import_taric.py)
+       kb/processed/regulations_data.json (import_regulations.py)
+Output: kb/processed/tariff_regulations_index.json
+"""
+
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from artifact_store import write_json
+from tariff_index import build_regulation_index, report_unresolved, split_tariff_numbers
+from tariff_table import TABLE_FILE, TariffTable
+
+REGULATIONS_FILE = Path(__file__).parent.parent / "processed" / "regulations_data.json"
+OUTPUT_FILE = Path(__file__).parent.parent / "processed" / "tariff_regulations_index.json"
+
+def build_tariff_regulations(table, regulations):
+    """
+    Враќа (индекс, сирачиња): индекс {тарифна ознака: [CELEX]} и листа на
+    регулативи чии тарифни ознаки не покриваат ниту една TARIC ознака.
+    """
+    # Споените ознаки се делат само ако секој дел постои во TARIC табелата
+    known = lambda code: bool(table.codes_under(code))
+    unresolved = []
+    regulation_index = build_regulation_index(regulations, known, unresolved)
+    report_unresolved(unresolved)
+
+    index = {}
+    resolved = set()
+    for prefix in regulation_index.under(""):
+        celex_numbers = regulation_index.get(prefix)
+        for tariff_number in table.codes_under(prefix):
+            resolved.add(prefix)
+            # dict како подредено множество: без дупликати, редоследот се чува
+            index.setdefault(tariff_number, {}).update(dict.fromkeys(celex_numbers))
+
+    orphans = [
+        {"celexNumber": regulation["celexNumber"], "tariffNumber": regulation.get("tariffNumber")}
+        for regulation in regulations
+        if not any(code in resolved for code in split_tariff_numbers(regulation.get("tariffNumber"), known))
+    ]
+
+    return {code: list(index[code]) for code in sorted(index)}, orphans
+
+def load_tariff_regulations(path=OUTPUT_FILE):
+    """Вчитај го обратниот индекс {тарифна ознака: [CELEX]}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)["index"]
+
+def main():
+    print("=" * 80)
+    print("🔗 СПОЈУВАЊЕ НА ТАРИФНИ ОЗНАКИ И РЕГУЛАТИВИ")
+    print("=" * 80)
+
+    print(f"📂 Регулативи: {REGULATIONS_FILE}")
+    with open(REGULATIONS_FILE, 'r', encoding='utf-8') as f:
+        regulations = json.load(f)
+
+    print(f"📂 TARIC табела: {TABLE_FILE}")
+    with TariffTable(TABLE_FILE) as table:
+        index, orphans = build_tariff_regulations(table, regulations)
+        tariff_count = len(table)
+
+    output = {
+        "metadata": {
+            "generated": datetime.now().isoformat(),
+            "tariffCodes": tariff_count,
+            "regulations": len(regulations),
+            "tariffCodesWithRegulations": len(index),
+            "orphanRegulations": len(orphans)
+        },
+        "index": index,
+        "orphans": orphans
+    }
+
+    # Времето на генерирање не влегува во хешот: непроменет индекс не се препишува
+    written = write_json(OUTPUT_FILE, output, volatile=("metadata.generated",))
+    print(f"\n💾 Зачувано во: {OUTPUT_FILE}" if written else
+          f"\n⏭️  Непроменето, не е препишано: {OUTPUT_FILE}")
+
+    # Статистика
+    print(f"\n✅ Тарифни ознаки со регулативи: {len(index)} од {tariff_count}")
+    print(f"⚠️  Регулативи без TARIC ознака (сирачиња): {len(orphans)} од {len(regulations)}")
+    print(f"📦 Фајл: {OUTPUT_FILE}")
+
+    print(f"\n📋 Примери (прва 3 ознаки):")
+    for tariff_number, celex_numbers in list(index.items())[:3]:
+        print(f"  {tariff_number}: {', '.join(celex_numbers[:5])}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except FileNotFoundError as e:
+        print(f"❌ Грешка: Фајлот не постои (прво пушти import_taric.py и import_regulations.py): {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Грешка: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Векторизиран калкулатор за LON Calculation правилата
+Ставките од декларациите се претвораат во колони (NumPy низи), се спојуваат
+со царинските стапки од TARIC табелата и формулите се пресметуваат врз
+цели колони наеднаш, без циклус по ставка:
+
+    BOX40_ZERO_FOR_4200    DutyRate = 0 WHEN ProcedureCode = '42 00'
+    LON_YIELD_RATE_CHECK   CompensatingQuantity <= ImportQuantity * YieldRate * (1 + AllowedWastePercentage)
+    LON_COMPLETION_PERIOD  DueDate <= DeclarationDate + CompletionPeriodDays
+
+Статус по ставка: 1 = исполнето, 0 = прекршено, -1 = не важи / нема податоци.
+Процедурите за секое правило се читаат од lon_validation_rules.json.
+
+Употреба: python kb/scripts/calculation_engine.py items.json|.ndjson [--output results.ndjson]
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+from validation_engine import RULES_FILE, field_value, load_declarations
+
+PASS, FAIL, NOT_APPLICABLE = 1, 0, -1
+
+# Толеранција при споредба на количини
+QUANTITY_TOLERANCE = 1e-9
+
+# Колона → (тип, патеки во ставката по редослед на пребарување)
+COLUMNS = {
+    "ProcedureCode": ("text", ["ProcedureCode"]),
+    "TariffCode": ("text", ["TariffCode"]),
+    "DutyRate": ("number", ["DutyRate"]),
+    "CustomsValue": ("number", ["CustomsValue"]),
+    "ImportQuantity": ("number", ["ImportQuantity"]),
+    "CompensatingQuantity": ("number", ["CompensatingQuantity"]),
+    "YieldRate": ("number", ["YieldRate", "LONAuthorizationItem.YieldRate"]),
+    "AllowedWastePercentage": ("number", ["AllowedWastePercentage", "LONAuthorizationItem.AllowedWastePercentage"]),
+    "DeclarationDate": ("date", ["DeclarationDate"]),
+    "DueDate": ("date", ["DueDate"]),
+    "CompletionPeriodDays": ("number", ["CompletionPeriodDays", "LONAuthorization.CompletionPeriodDays"]),
+}
+
+CALCULATION_RULES = ("BOX40_ZERO_FOR_4200", "LON_YIELD_RATE_CHECK", "LON_COMPLETION_PERIOD")
+
+# ==============================================================================
+# Колони
+# ==============================================================================
+
+def _number(value):
+    if value is None or isinstance(value, bool):
+        return np.nan
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(str(value).replace(",", "."))
+    except ValueError:
+        return np.nan
+
+
+def _date(value):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _lookup(item, paths):
+    for path in paths:
+        value = field_value(item, path)
+        if value is not None:
+            return value
+    return None
+
+
+def to_columns(items):
+    """Листа на ставки (dict) → {колона: NumPy низа}; празни вредности се NaN / NaT / ''"""
+    items = list(items)
+    count = len(items)
+    columns = {}
+    for name, (kind, paths) in COLUMNS.items():
+        values = [_lookup(item, paths) for item in items]
+        if kind == "number":
+            columns[name] = np.fromiter((_number(value) for value in values), dtype=np.float64, count=count)
+        elif kind == "date":
+            columns[name] = np.array([_date(value) for value in values], dtype="datetime64[D]")
+        else:
+            columns[name] = np.array(["" if value is None else str(value) for value in values], dtype=str)
+    return columns
+
+
+def join_tariff_rates(tariff_codes, tariffs):
+    """
+    Царинска стапка за секоја ставка (NaN ако ознаката не постои).
+    Секоја различна ознака се бара еднаш; tariffs е TariffTable или {ознака: запис}.
+    """
+    codes, inverse = np.unique(tariff_codes, return_inverse=True)
+    if hasattr(tariffs, "lookup_many"):
+        records = tariffs.lookup_many(codes.tolist())
+    else:
+        records = {code: tariffs.get(code) for code in codes.tolist()}
+
+    unique_rates = np.fromiter(
+        (_number((records.get(code) or {}).get("customsRate")) for code in codes.tolist()),
+        dtype=np.float64, count=len(codes)
+    )
+    return unique_rates[inverse.reshape(-1)]
+
+# ==============================================================================
+# Пресметка
+# ==============================================================================
+
+def load_procedures(path=RULES_FILE):
+    """{ruleCode: frozenset процедури} за Calculation правилата од lon_validation_rules.json"""
+    with open(path, 'r', encoding='utf-8') as f:
+        rules = {rule["ruleCode"]: rule for rule in json.load(f)}
+    procedures = {}
+    for code in CALCULATION_RULES:
+        procedure = rules[code].get("procedureCode")
+        procedures[code] = frozenset(procedure.split("|")) if procedure else None
+    return procedures
+
+
+def _applies(procedure_codes, procedures):
+    if procedures is None:
+        return np.ones(len(procedure_codes), dtype=bool)
+    return np.isin(procedure_codes, sorted(procedures))
+
+
+def _status(applies, passed, known):
+    status = np.full(len(applies), NOT_APPLICABLE, dtype=np.int8)
+    checked = applies & known
+    status[checked] = np.where(passed[checked], PASS, FAIL)
+    return status
+
+
+def calculate(columns, procedures, rates=None):
+    """
+    Пресметај ги Calculation правилата врз колоните.
+    Враќа {колона: низа}: статус по правило (1/0/-1) и пресметаните износи
+    (taricRate, effectiveRate, dutyAmount, allowedQuantity, deadline).
+    """
+    procedure_codes = columns["ProcedureCode"]
+    count = len(procedure_codes)
+    results = {}
+
+    # Box 40: стапка 0 за 42 00, царина од TARIC за останатите
+    duty_rate = columns["DutyRate"]
+    zero_applies = _applies(procedure_codes, procedures["BOX40_ZERO_FOR_4200"])
+    results["BOX40_ZERO_FOR_4200"] = _status(zero_applies, duty_rate == 0, ~np.isnan(duty_rate))
+
+    taric_rate = rates if rates is not None else np.full(count, np.nan)
+    effective_rate = np.where(zero_applies, 0.0, taric_rate)
+    results["taricRate"] = taric_rate
+    results["effectiveRate"] = effective_rate
+    results["dutyAmount"] = columns["CustomsValue"] * effective_rate / 100
+
+    # Принос: дозволена количина на компензациски производ
+    allowed = columns["ImportQuantity"] * columns["YieldRate"] * (1 + columns["AllowedWastePercentage"])
+    compensating = columns["CompensatingQuantity"]
+    results["allowedQuantity"] = allowed
+    results["LON_YIELD_RATE_CHECK"] = _status(
+        _applies(procedure_codes, procedures["LON_YIELD_RATE_CHECK"]),
+        compensating <= allowed + QUANTITY_TOLERANCE,
+        ~(np.isnan(allowed) | np.isnan(compensating))
+    )
+
+    # Рок за завршување: DeclarationDate + CompletionPeriodDays
+    period = columns["CompletionPeriodDays"]
+    known_period = ~np.isnan(period)
+    days = np.where(known_period, period, 0).astype("timedelta64[D]")
+    deadline = columns["DeclarationDate"] + days
+    deadline[~known_period] = np.datetime64("NaT")
+    due_date = columns["DueDate"]
+    results["deadline"] = deadline
+    results["LON_COMPLETION_PERIOD"] = _status(
+        _applies(procedure_codes, procedures["LON_COMPLETION_PERIOD"]),
+        due_date <= deadline,
+        ~(np.isnat(deadline) | np.isnat(due_date))
+    )
+
+    return results
+
+
+def iter_results(results):
+    """Резултати по ставка како dict (NaN / NaT → None)"""
+    names = list(results)
+    for row in zip(*(results[name].tolist() for name in names)):
+        yield {
+            name: None if value is None or (isinstance(value, float) and value != value) else
+            value.isoformat() if hasattr(value, "isoformat") else value
+            for name, value in zip(names, row)
+        }
+
+
+def main():
+    from tariff_table import TABLE_FILE, TariffTable
+
+    parser = argparse.ArgumentParser(description="Векторизирана пресметка на LON Calculation правила")
+    parser.add_argument("items", type=Path, help="JSON листа или NDJSON со ставки од декларации")
+    parser.add_argument("--rules", type=Path, default=RULES_FILE, help="lon_validation_rules.json")
+    parser.add_argument("--tariff-table", type=Path, default=TABLE_FILE,
+                        help="бинарна TARIC табела (import_taric.py)")
+    parser.add_argument("--output", type=Path, default=None, help="NDJSON со резултат по ставка")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("🧮 ПРЕСМЕТКА НА LON CALCULATION ПРАВИЛА")
+    print("=" * 80)
+
+    items = load_declarations(args.items)
+    procedures = load_procedures(args.rules)
+
+    started = time.perf_counter()
+    columns = to_columns(items)
+    loaded = time.perf_counter()
+
+    rates = None
+    if args.tariff_table.exists():
+        with TariffTable(args.tariff_table) as table:
+            rates = join_tariff_rates(columns["TariffCode"], table)
+    else:
+        print(f"⚠️  Нема TARIC табела ({args.tariff_table}), стапките од TARIC се прескокнуваат")
+
+    results = calculate(columns, procedures, rates)
+    elapsed = time.perf_counter() - started
+
+    print(f"📋 Ставки: {len(items)} (колони: {loaded - started:.2f} с, вкупно: {elapsed:.2f} с)")
+    for code in CALCULATION_RULES:
+        status = results[code]
+        print(f"  {code}: ✅ {int((status == PASS).sum())}  ❌ {int((status == FAIL).sum())}  "
+              f"➖ {int((status == NOT_APPLICABLE).sum())}")
+    print(f"💰 Вкупна царина: {np.nansum(results['dutyAmount']):,.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for result in iter_results(results):
+                f.write(json.dumps(result, ensure_ascii=False))
+                f.write("\n")
+        print(f"📦 Фајл: {args.output}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except FileNotFoundError as e:
+        print(f"❌ Грешка: Фајлот не постои: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Грешка: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
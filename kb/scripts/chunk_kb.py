@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Script за претходно сечење на базата на знаење на RAG chunks
+Истата логика како DocumentChunkingService (1000 карактери, 200 преклоп,
+секции "Член N" / "Глава N" со поделба над 2000 карактери), но однапред,
+надвор од API процесот:
+- регулативите се сечат по поле (descriptionMK, descriptionEN, legalBasis),
+  па секој chunk носи поле и јазик;
+- границите се на крај од реченица (со кирилични кратенки како "бр.",
+  "чл.", "тар." што не завршуваат реченица), а преклопот е цели реченици;
+- секој chunk ја носи проценката на токени (EstimateTokenCount) и
+  позицијата (start, end) во изворниот текст.
+
+Извор: kb/processed/regulations_data.json, kb/processed/corpus_pages.ndjson
+Output: kb/processed/kb_chunks.ndjson
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+from pathlib import Path
+
+PROCESSED_DIR = Path(__file__).parent.parent / "processed"
+REGULATIONS_FILE = PROCESSED_DIR / "regulations_data.json"
+# Излезот на build_corpus.py (се чита директно, без PyPDF2)
+CORPUS_FILE = PROCESSED_DIR / "corpus_pages.ndjson"
+CHUNKS_FILE = PROCESSED_DIR / "kb_chunks.ndjson"
+
+# Исто како DocumentChunkingService.ChunkDocument / ChunkBySection
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+SECTION_MAX_SIZE = 2000
+SECTION_CHUNK_SIZE = 1500
+SECTION_DELIMITERS = ("Член", "Глава")
+
+# Поле → јазик
+REGULATION_FIELDS = {
+    "descriptionMK": "MK",
+    "descriptionEN": "EN",
+    "legalBasis": "MK",
+}
+
+# ==============================================================================
+# Реченици
+# ==============================================================================
+
+# Крај на реченица (интерпункција + празно место) или празен ред меѓу пасуси
+_SENTENCE_END = re.compile(r"[.!?…]+[\"'”»)]*\s+|\n\s*\n")
+_LAST_WORD = re.compile(r"(\w+)\W*$")
+_WORD_START = re.compile(r"(?<=\s)\S")
+
+# Кратенки после кои точката не е крај на реченица
+ABBREVIATIONS = frozenset("""
+    бр чл ст тар т точ ал год г сл ул пр нпр итн др в тн стр рег сп
+    no art par nr etc e g i ie eg vs
+""".split())
+
+
+def estimate_tokens(text):
+    """Иста апроксимација како EstimateTokenCount: 1 токен ≈ 4 карактери"""
+    return math.ceil(len(text) / 4) if text and text.strip() else 0
+
+
+def _is_boundary(text, match):
+    """Дали совпаѓањето навистина завршува реченица"""
+    if match.group().count("\n") >= 2:
+        return True
+    if text[match.start()] == ".":
+        word = _LAST_WORD.search(text, max(0, match.start() - 20), match.start())
+        if word:
+            word = word.group(1)
+            # Кратенки, иницијали и редни броеви ("1. ", "ii. ")
+            if word.casefold() in ABBREVIATIONS or len(word) == 1 or (word.isdigit() and len(word) <= 3):
+                return False
+    following = text[match.end():match.end() + 1]
+    return not following or not following.islower()
+
+
+def sentence_spans(text):
+    """(start, end) на речениците во текстот; празните места остануваат на крајот од реченицата"""
+    spans = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        if _is_boundary(text, match):
+            spans.append((start, match.end()))
+            start = match.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+
+def _split_long(text, start, end, max_size):
+    """Реченица подолга од max_size → делови на граница на збор (како ChunkDocument)"""
+    pieces = []
+    while end - start > max_size:
+        cut = text.rfind(" ", start + 1, start + max_size)
+        cut = cut + 1 if cut > start else start + max_size
+        pieces.append((start, cut))
+        start = cut
+    pieces.append((start, end))
+    return pieces
+
+# ==============================================================================
+# Сечење
+# ==============================================================================
+
+def chunk_spans(text, max_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """
+    Сечи текст на (start, end) делови до max_size карактери по граница на
+    реченица; следниот дел почнува со последните реченици (до overlap
+    карактери) од претходниот. Ако ниту една цела реченица не собира во
+    преклопот, тој почнува на граница на збор (како ChunkDocument).
+    """
+    spans = []
+    for start, end in sentence_spans(text):
+        spans.extend(piece for piece in _split_long(text, start, end, max_size)
+                     if text[piece[0]:piece[1]].strip())
+
+    chunks = []
+    i = 0
+    start = spans[0][0] if spans else 0
+    while i < len(spans):
+        if spans[i][1] - start > max_size:
+            start = spans[i][0]
+        j = i + 1
+        while j < len(spans) and spans[j][1] - start <= max_size:
+            j += 1
+        end = spans[j - 1][1]
+
+        # Без празни места на рабовите
+        content_start = start + len(text[start:end]) - len(text[start:end].lstrip())
+        content_end = start + len(text[start:end].rstrip())
+        if content_end > content_start:
+            chunks.append((content_start, content_end))
+        if j >= len(spans):
+            break
+
+        # Преклоп: последните реченици што собираат и во overlap и заедно со следната
+        k = j
+        while k - 1 > i and end - spans[k - 1][0] <= overlap and spans[j][1] - spans[k - 1][0] <= max_size:
+            k -= 1
+        if k < j:
+            start = spans[k][0]
+        else:
+            word = _WORD_START.search(text, max(end - overlap, content_start + 1), end) if overlap else None
+            start = word.start() if word else spans[j][0]
+        i = k
+    return chunks
+
+
+_SECTION = re.compile(rf"^(?:{'|'.join(map(re.escape, SECTION_DELIMITERS))})\s+\d+", re.MULTILINE)
+
+
+def chunk_sections(text, max_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """
+    Како ChunkBySection: делови по "Член N" / "Глава N"; секција подолга од
+    SECTION_MAX_SIZE се дели на SECTION_CHUNK_SIZE со преклоп overlap. Текстот
+    пред првата секција е посебен дел, сечен на max_size со преклоп overlap.
+    Враќа [(наслов или None, start, end)].
+    """
+    matches = list(_SECTION.finditer(text))
+    bounds = [(None, 0, matches[0].start() if matches else len(text))]
+    for position, match in enumerate(matches):
+        end = matches[position + 1].start() if position + 1 < len(matches) else len(text)
+        bounds.append((match.group(), match.start(), end))
+
+    chunks = []
+    for title, start, end in bounds:
+        section = text[start:end]
+        if not section.strip():
+            continue
+        if title is None:
+            spans = chunk_spans(section, max_size, overlap)
+        elif len(section.strip()) <= SECTION_MAX_SIZE:
+            spans = chunk_spans(section, SECTION_MAX_SIZE, 0)
+        else:
+            spans = chunk_spans(section, SECTION_CHUNK_SIZE, overlap)
+        for part, (span_start, span_end) in enumerate(spans, 1):
+            part_title = title if title is None or len(spans) == 1 else f"{title} (дел {part}/{len(spans)})"
+            chunks.append((part_title, start + span_start, start + span_end))
+    return chunks
+
+
+def _chunk(text, start, end, **fields):
+    content = text[start:end]
+    return {**fields, "start": start, "end": end, "content": content, "tokenCount": estimate_tokens(content)}
+
+
+def regulation_key(regulation):
+    """Стабилен клуч на регулатива: CELEX + тарифни ознаки ('CELEX бр 32006R0227' → '32006R0227')"""
+    celex = (regulation.get("celexNumber") or "").split()
+    tariff = (regulation.get("tariffNumber") or "").split()
+    return f"{celex[-1] if celex else '-'}-{'+'.join(tariff) or '-'}"
+
+
+def iter_regulation_chunks(regulations, max_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """
+    Chunks од регулативите, посебно за секое поле. Id-то е од CELEX и
+    тарифните ознаки (не од позицијата во листата), па нова регулатива не
+    ги менува id-ата на другите; повторен ист клуч добива реден број.
+    """
+    seen = {}
+    for regulation in regulations:
+        key = regulation_key(regulation)
+        occurrence = seen[key] = seen.get(key, -1) + 1
+        if occurrence:
+            key = f"{key}-{occurrence}"
+        for field, language in REGULATION_FIELDS.items():
+            text = regulation.get(field)
+            if not text or not text.strip():
+                continue
+            for chunk_index, (start, end) in enumerate(chunk_spans(text, max_size, overlap)):
+                yield _chunk(
+                    text, start, end,
+                    id=f"reg-{key}-{field}-{chunk_index}",
+                    source=REGULATIONS_FILE.name,
+                    document=regulation.get("celexNumber"),
+                    tariffNumber=regulation.get("tariffNumber"),
+                    field=field,
+                    language=language,
+                    chunkIndex=chunk_index,
+                    title=regulation.get("celexNumber")
+                )
+
+
+def iter_page_chunks(pages, max_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """Chunks од страниците на корпусот (по секции "Член N" / "Глава N")"""
+    for page in pages:
+        text = page["text"]
+        for chunk_index, (title, start, end) in enumerate(chunk_sections(text, max_size, overlap)):
+            yield _chunk(
+                text, start, end,
+                id=f"{page['source']}#{page['page']}-{chunk_index}",
+                source=page["source"],
+                sha256=page["sha256"],
+                page=page["page"],
+                field="text",
+                language="MK",
+                chunkIndex=chunk_index,
+                title=title
+            )
+
+
+def iter_ndjson(path):
+    """Генератор кој ги чита NDJSON записите еден по еден"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_corpus(path=CORPUS_FILE):
+    """Страниците на корпусот (build_corpus.py)"""
+    return iter_ndjson(path)
+
+
+def iter_chunks(path=CHUNKS_FILE):
+    """Генератор кој ги чита chunks еден по еден"""
+    return iter_ndjson(path)
+
+
+def write_chunks(chunks, output_file=CHUNKS_FILE):
+    """Запиши ги chunks како NDJSON (атомски); враќа {извор: број на chunks}"""
+    output_file = Path(output_file)
+    output_file.parent.mkdir(exist_ok=True)
+    tmp_file = output_file.with_name(output_file.name + ".tmp")
+    counts = {}
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk, ensure_ascii=False))
+            f.write("\n")
+            counts[chunk["source"]] = counts.get(chunk["source"], 0) + 1
+    os.replace(tmp_file, output_file)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Претходно сечење на KB текстовите на RAG chunks")
+    parser.add_argument("--output", type=Path, default=CHUNKS_FILE, help="NDJSON со chunks")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="максимум карактери по chunk (регулативи и текст на страница надвор од "
+                             f"Член/Глава; секциите се сечат на {SECTION_CHUNK_SIZE})")
+    parser.add_argument("--overlap", type=int, default=CHUNK_OVERLAP,
+                        help="преклоп во карактери (регулативи и страници)")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("✂️  СЕЧЕЊЕ НА БАЗАТА НА ЗНАЕЊЕ НА CHUNKS")
+    print("=" * 80)
+
+    with open(REGULATIONS_FILE, 'r', encoding='utf-8') as f:
+        regulations = json.load(f)
+
+    def chunks():
+        yield from iter_regulation_chunks(regulations, args.chunk_size, args.overlap)
+        if CORPUS_FILE.exists():
+            yield from iter_page_chunks(iter_corpus(CORPUS_FILE), args.chunk_size, args.overlap)
+        else:
+            print(f"⚠️  Нема корпус ({CORPUS_FILE}), се сечат само регулативите")
+
+    counts = write_chunks(chunks(), args.output)
+
+    print(f"\n✅ Вкупно chunks: {sum(counts.values())}")
+    for source, count in sorted(counts.items()):
+        print(f"  📄 {source}: {count}")
+    print(f"📦 Фајл: {args.output}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except FileNotFoundError as e:
+        print(f"❌ Грешка: Фајлот не постои: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Грешка: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
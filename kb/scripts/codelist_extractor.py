@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Engine за екстракција на шифрарници од текст на PDF страници
+Регистрираните шеми (Box 15а, Box 29, ...) се компајлираат еднаш во
+еден регуларен израз со алтернации, па секоја страница се скенира во
+едно поминување и совпаѓањата се праќаат до handler-от на соодветниот Box.
+Шемите важат само на своите страници, па изразот се гради (и кешира)
+по комбинација на Box-ови активни на страницата.
+
+Шемите мора да користат именувани групи (уникатни низ сите Box-ови);
+handler(match) враќа запис (dict) или None ако совпаѓањето се отфрла.
+"""
+
+import re
+
+
+class CodelistExtractor:
+    """Регистар на шеми по Box и екстракција во едно поминување"""
+
+    def __init__(self):
+        self._boxes = {}
+        self._patterns = {}
+
+    def register(self, name, pattern, handler, pages=None):
+        """
+        Регистрирај шема за Box.
+        name    - идентификатор на групата (пр. "box15a")
+        pages   - страници (индекси од 0) каде важи шемата; None = сите
+        """
+        if name in self._boxes:
+            raise ValueError(f"Box {name} е веќе регистриран")
+        self._boxes[name] = {
+            "pattern": pattern,
+            "handler": handler,
+            "pages": None if pages is None else frozenset(pages)
+        }
+        self._patterns.clear()
+
+    def pages(self):
+        """Унија на страниците потребни за сите Box-ови (None ако некој ги бара сите)"""
+        pages = set()
+        for box in self._boxes.values():
+            if box["pages"] is None:
+                return None
+            pages |= box["pages"]
+        return sorted(pages)
+
+    def _active(self, page_num):
+        """Box-ови што важат на дадена страница"""
+        return tuple(name for name, box in self._boxes.items()
+                     if box["pages"] is None or page_num in box["pages"])
+
+    def pattern(self, names=None):
+        """
+        Комбиниран компајлиран израз за дадените Box-ови (стандардно сите).
+        Се гради еднаш по комбинација и се чува во кеш.
+        """
+        names = tuple(self._boxes) if names is None else tuple(names)
+        pattern = self._patterns.get(names)
+        if pattern is None:
+            pattern = re.compile("|".join(
+                f"(?P<{name}>{self._boxes[name]['pattern']})" for name in names
+            ))
+            self._patterns[names] = pattern
+        return pattern
+
+    def extract(self, page_texts):
+        """
+        Скенирај ги страниците {индекс: текст}, секоја во едно поминување
+        со шемите на Box-овите што важат за неа.
+        Враќа {име на Box: [записи]} по редослед на појавување.
+        """
+        results = {name: [] for name in self._boxes}
+        boxes = self._boxes
+
+        for page_num, text in page_texts.items():
+            names = self._active(page_num)
+            if not names:
+                continue
+            for match in self.pattern(names).finditer(text):
+                name = match.lastgroup
+                record = boxes[name]["handler"](match)
+                if record is not None:
+                    results[name].append(record)
+
+        return results
@@ -5,9 +5,10 @@ Script за креирање на LON-специфични код листи
 Output: kb/processed/lon_codelists.json
 """
 
-import json
 from pathlib import Path
 
+from artifact_store import write_json
+
 def create_lon_codelists():
     """Креира код листи за LON процедури"""
     
@@ -212,8 +213,8 @@ def create_lon_codelists():
     
     # Зачувај
     print(f"💾 Зачувување во: {output_file}")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(codelists, f, ensure_ascii=False, indent=2)
+    if not write_json(output_file, codelists):
+        print("⏭️  Содржината е непроменета, фајлот не е препишан")
     
     # Статистика
     total_codes = sum(len(items) for items in codelists.values())
@@ -10,10 +10,11 @@
 - Опис на македонски и англиски
 """
 
-import json
 import os
 from datetime import datetime
 
+from artifact_store import write_json
+
 # ==============================================================================
 # COMPLETE CODE LISTS FROM PRAVILNIK - POGLAVJE II ŠIFRI
 # ==============================================================================
@@ -432,8 +433,8 @@ def main():
         "lon_codelists_complete.json"
     )
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
+    # Времето на генерирање не влегува во хешот: непроменети шифрарници не се препишуваат
+    written = write_json(output_path, output, volatile=("metadata.generated",))
     
     # Испечати резултат
     print(f"\n✅ Успешно креирани {len(codelists)} шифрарници со вкупно {total_codes} кодови")
@@ -452,7 +453,8 @@ def main():
         box_label = f"Box {box_num}" if box_num else "LON Специфични"
         print(f"   └─ {box_label:20s}: {stats['lists']} листи, {stats['codes']} кодови")
     
-    print(f"\n💾 Зачувано во: {output_path}")
+    print(f"\n💾 Зачувано во: {output_path}" if written else
+          f"\n⏭️  Непроменето, не е препишано: {output_path}")
     
     # Прикажи примери
     print("\n📋 ПРИМЕРИ:")
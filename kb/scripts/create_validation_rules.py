@@ -3,15 +3,19 @@
 Script за креирање на LON валидациски правила
 Извор: Правилник за пополнување на царинска декларација, Упатство LON
 Output: kb/processed/lon_validation_rules.json
+        kb/processed/lon_validation_index.json (индекс по процедура и поле)
 """
 
-import json
 from pathlib import Path
 
+from artifact_store import write_json
+from validation_engine import RuleIndex, compile_rules
+
 def create_lon_validation_rules():
     """Креира валидациски правила за LON процедури"""
     
     output_file = Path(__file__).parent.parent / "processed" / "lon_validation_rules.json"
+    index_file = output_file.with_name("lon_validation_index.json")
     output_file.parent.mkdir(exist_ok=True)
     
     rules = [
@@ -240,8 +244,14 @@ def create_lon_validation_rules():
     
     # Зачувај
     print(f"💾 Зачувување во: {output_file}")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(rules, f, ensure_ascii=False, indent=2)
+    if not write_json(output_file, rules):
+        print("⏭️  Содржината е непроменета, фајлот не е препишан")
+    
+    # Индекс на применливост (правилата се компајлираат за да се знае што читаат)
+    index = RuleIndex(compile_rules(rules))
+    print(f"💾 Зачувување на индекс во: {index_file}")
+    if not write_json(index_file, index.to_json()):
+        print("⏭️  Индексот е непроменет, фајлот не е препишан")
     
     # Статистика
     print(f"\n✅ Креирани {len(rules)} валидациски правила:")
@@ -265,7 +275,14 @@ def create_lon_validation_rules():
     for proc, count in sorted(by_procedure.items()):
         print(f"  {proc}: {count}")
     
+    cross_table = sum(1 for rule in index.rules if rule.cross_table)
+    print(f"\n📊 Индекс: {len(index.by_procedure)} процедури, {len(index.by_field)} полиња, "
+          f"{cross_table} CrossTable / {len(index.rules) - cross_table} локални правила")
+    for procedure, procedure_rules in index.by_procedure.items():
+        print(f"  {procedure}: {len(procedure_rules)} правила")
+    
     print(f"\n📦 Фајл: {output_file}")
+    print(f"📦 Индекс: {index_file}")
 
 if __name__ == "__main__":
     create_lon_validation_rules()
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Script за пресметка на embedding вектори за KB chunks
+Backend-от е заменлив (BACKENDS):
+- "local": без мрежа и детерминистички - hashing vectorizer (зборови и
+  биграми од regulation_search.tokenize) + TF-IDF + SVD проекција (рандомизиран
+  SVD, само NumPy) научена на самиот KB корпус. Моделот се зачувува и се
+  користи повторно, па векторите на непроменет текст остануваат исти; ако
+  корпусот се смени толку што речникот покрива видливо помалку од текстот,
+  моделот се учи одново.
+- "openai": истиот модел како OpenAIEmbeddingService (OPENAI_API_KEY,
+  OPENAI_EMBEDDING_MODEL), по пакети.
+Векторите се кешираат по (модел, хеш на текст) во embedding_cache.py, па
+при ново градење се пресметуваат само изменетите chunks. Id-то на локалниот
+модел е хеш од научените параметри, па ново учење не ги користи старите вектори.
+
+Извор: kb/processed/kb_chunks.ndjson (chunk_kb.py)
+Output: kb/processed/kb_embeddings.f32  (float32 матрица, ред по chunk)
+        kb/processed/kb_embeddings.json (модел, димензија, ред → id на chunk)
+        kb/processed/embedding_model_local.npz (научен локален модел)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import urllib.request
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from chunk_kb import CHUNKS_FILE, iter_chunks
+from embedding_cache import MAX_CACHE_BYTES, CachedBackend, EmbeddingCache, format_stats
+from regulation_search import tokenize
+
+PROCESSED_DIR = Path(__file__).parent.parent / "processed"
+EMBEDDINGS_FILE = PROCESSED_DIR / "kb_embeddings.f32"
+EMBEDDINGS_MAP_FILE = PROCESSED_DIR / "kb_embeddings.json"
+LOCAL_MODEL_FILE = PROCESSED_DIR / "embedding_model_local.npz"
+
+# Локален модел
+HASH_FEATURES = 1 << 20
+LOCAL_DIMENSIONS = 256
+MIN_DOCUMENT_FREQUENCY = 2
+SVD_OVERSAMPLING = 16
+SVD_POWER_ITERATIONS = 2
+SVD_SEED = 0
+# Пад на покриеноста со речникот (дел од појавувањата на зборови) од учењето
+# до денес над кој моделот се учи одново
+MAX_VOCABULARY_DRIFT = 0.05
+
+# Колку ненулти вредности се множат одеднаш (ограничува меморија кај sparse × dense)
+SPARSE_BLOCK = 1 << 16
+
+BATCH_SIZE = 512
+
+# ==============================================================================
+# Sparse матрици (CSR) со NumPy
+# ==============================================================================
+
+def _spmm(indptr, indices, data, dense):
+    """CSR (indptr, indices, data) × dense матрица"""
+    rows = len(indptr) - 1
+    out = np.zeros((rows, dense.shape[1]), dtype=np.float32)
+    row = 0
+    while row < rows:
+        # Блок редови со најмногу SPARSE_BLOCK ненулти вредности
+        end = int(np.searchsorted(indptr, indptr[row] + SPARSE_BLOCK, side="right")) - 1
+        end = min(max(end, row + 1), rows)
+        start_nz, end_nz = indptr[row], indptr[end]
+        if end_nz > start_nz:
+            products = data[start_nz:end_nz, None] * dense[indices[start_nz:end_nz]]
+            counts = np.diff(indptr[row:end + 1])
+            nonempty = counts > 0
+            out[row:end][nonempty] = np.add.reduceat(products, (indptr[row:end] - start_nz)[nonempty])
+        row = end
+    return out
+
+
+def _transpose(indptr, indices, data, columns):
+    """CSR → CSR на транспонираната матрица"""
+    rows = _row_ids(indptr)
+    order = np.argsort(indices, kind="stable")
+    counts = np.bincount(indices, minlength=columns)
+    t_indptr = np.concatenate(([0], np.cumsum(counts)))
+    return t_indptr, rows[order], data[order]
+
+# ==============================================================================
+# Локален backend: hashing + TF-IDF + SVD
+# ==============================================================================
+
+def hashed_features(text):
+    """Зборови и соседни парови (биграми) → индекси во хеш просторот"""
+    terms = tokenize(text)
+    grams = terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+    return [zlib.crc32(gram.encode("utf-8")) % HASH_FEATURES for gram in grams]
+
+
+def hashed_counts(texts):
+    """Текстови → CSR со број на појавувања по хеш индекс"""
+    indptr = [0]
+    indices = []
+    counts = []
+    for text in texts:
+        features, frequency = np.unique(np.array(hashed_features(text), dtype=np.int64), return_counts=True)
+        indices.append(features)
+        counts.append(frequency)
+        indptr.append(indptr[-1] + len(features))
+    return (np.array(indptr, dtype=np.int64),
+            np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64),
+            np.concatenate(counts).astype(np.float32) if counts else np.zeros(0, dtype=np.float32))
+
+
+def _row_ids(indptr):
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def _normalize_rows(indptr, data):
+    rows = _row_ids(indptr)
+    norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(indptr) - 1))
+    norms[norms == 0] = 1.0
+    return (data / norms[rows]).astype(np.float32)
+
+
+def corpus_fingerprint(texts):
+    """SHA-256 од текстовите по редослед"""
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _l2(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+class LocalEmbeddingBackend:
+    """Hashing vectorizer + TF-IDF + SVD проекција научена на KB корпусот"""
+
+    name = "local"
+
+    def __init__(self, columns=None, idf=None, components=None, fingerprint=None, coverage=None):
+        self.columns = columns          # сортирани хеш индекси во речникот
+        self.idf = idf                  # idf по колона
+        self.components = components    # колони × димензии
+        self.fingerprint = fingerprint  # corpus_fingerprint на корпусот за учење
+        self.coverage = coverage        # покриеност на тој корпус со речникот
+        self.model_id = None
+        if components is not None:
+            self.model_id = self._model_id()
+
+    @property
+    def dimensions(self):
+        return self.components.shape[1]
+
+    def _model_id(self):
+        # Само од научените параметри: секое учење што дава друг модел дава друго
+        # id, па кешот (по модел и текст) не враќа вектори од претходно учење
+        digest = hashlib.sha256()
+        for array in (self.columns, self.idf, self.components):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return f"local-hash-svd-{self.dimensions}-{digest.hexdigest()[:16]}"
+
+    def _tfidf(self, texts):
+        """TF-IDF (сублинеарен tf, L2 нормализиран) во колоните на речникот"""
+        indptr, indices, counts = hashed_counts(texts)
+        position = np.searchsorted(self.columns, indices)
+        position = np.minimum(position, len(self.columns) - 1)
+        known = self.columns[position] == indices
+        row_counts = np.bincount(_row_ids(indptr)[known], minlength=len(indptr) - 1)
+        indptr = np.concatenate(([0], np.cumsum(row_counts)))
+        columns = position[known]
+        data = (1 + np.log(counts[known])) * self.idf[columns]
+        return indptr, columns, _normalize_rows(indptr, data.astype(np.float32))
+
+    def vocabulary_coverage(self, texts):
+        """Дел од појавувањата на зборови/биграми во texts што се во речникот"""
+        _, indices, counts = hashed_counts(texts)
+        if not counts.sum():
+            return 1.0
+        position = np.minimum(np.searchsorted(self.columns, indices), len(self.columns) - 1)
+        return float(counts[self.columns[position] == indices].sum() / counts.sum())
+
+    def fit(self, texts, dimensions=LOCAL_DIMENSIONS):
+        """Научи речник, idf и SVD проекција од текстовите (детерминистички)"""
+        indptr, indices, counts = hashed_counts(texts)
+        documents = len(indptr) - 1
+        if documents == 0:
+            raise ValueError("Нема текстови за учење на локалниот модел")
+        frequency = np.bincount(indices, minlength=HASH_FEATURES)
+        self.columns = np.flatnonzero(frequency >= min(MIN_DOCUMENT_FREQUENCY, documents)).astype(np.int64)
+        if len(self.columns) == 0:
+            raise ValueError("Текстовите немаат ниту еден збор за речникот на локалниот модел")
+        self.idf = (np.log((1 + documents) / (1 + frequency[self.columns])) + 1).astype(np.float32)
+        self.fingerprint = corpus_fingerprint(texts)
+        self.coverage = float(counts[frequency[indices] >= min(MIN_DOCUMENT_FREQUENCY, documents)].sum()
+                              / counts.sum())
+        self.components = np.zeros((len(self.columns), 0), dtype=np.float32)
+
+        x = self._tfidf(texts)
+        x_t = _transpose(*x, len(self.columns))
+        rank = max(1, min(dimensions, documents, len(self.columns)))
+        sketch = min(rank + SVD_OVERSAMPLING, documents, len(self.columns))
+
+        # Рандомизиран SVD (Halko и др.): опсег на X преку X Ω, па SVD на мала матрица
+        rng = np.random.default_rng(SVD_SEED)
+        omega = rng.standard_normal((len(self.columns), sketch), dtype=np.float32)
+        basis, _ = np.linalg.qr(_spmm(*x, omega))
+        for _ in range(SVD_POWER_ITERATIONS):
+            basis, _ = np.linalg.qr(_spmm(*x_t, basis))
+            basis, _ = np.linalg.qr(_spmm(*x, basis))
+        small = _spmm(*x_t, basis).T                      # sketch × колони
+        left, singular, right = np.linalg.svd(small, full_matrices=False)
+        components = right[:rank].T
+        # Стабилен знак на секоја компонента (детерминистички излез)
+        signs = np.sign(components[np.abs(components).argmax(axis=0), np.arange(rank)])
+        signs[signs == 0] = 1
+        components = components * signs
+
+        # Секогаш точно dimensions колони (помал корпус → нулти колони)
+        components = np.pad(components[:, :dimensions], ((0, 0), (0, dimensions - min(rank, dimensions))))
+        self.components = components.astype(np.float32)
+        self.model_id = self._model_id()
+        return self
+
+    def embed(self, texts):
+        """Текстови → L2 нормализирани float32 вектори"""
+        return _l2(_spmm(*self._tfidf(texts), self.components))
+
+    def save(self, path=LOCAL_MODEL_FILE):
+        path = Path(path)
+        tmp_file = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp_file, columns=self.columns, idf=self.idf, components=self.components,
+                 fingerprint=np.array(self.fingerprint or ""),
+                 coverage=np.array(np.nan if self.coverage is None else self.coverage))
+        os.replace(tmp_file, path)
+
+    @classmethod
+    def load(cls, path=LOCAL_MODEL_FILE):
+        with np.load(path) as model:
+            # Модели зачувани пред fingerprint/coverage немаат податоци за корпусот
+            fingerprint = str(model["fingerprint"]) if "fingerprint" in model.files else ""
+            coverage = float(model["coverage"]) if "coverage" in model.files else np.nan
+            return cls(model["columns"], model["idf"], model["components"],
+                       fingerprint or None, None if np.isnan(coverage) else coverage)
+
+# ==============================================================================
+# Надворешен backend: OpenAI Embeddings API
+# ==============================================================================
+
+class OpenAIEmbeddingBackend:
+    """Ист endpoint и модел како OpenAIEmbeddingService во API-то"""
+
+    name = "openai"
+    endpoint = "https://api.openai.com/v1/embeddings"
+
+    def __init__(self, model=None, api_key=None, timeout=60):
+        self.model_id = model or os.environ.get("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
+        self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
+        if not self.api_key:
+            raise ValueError("OPENAI_API_KEY не е поставен")
+        self.timeout = timeout
+
+    def embed(self, texts):
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps({"input": list(texts), "model": self.model_id}).encode("utf-8"),
+            headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            data = json.load(response)["data"]
+        data.sort(key=lambda item: item["index"])
+        return np.array([item["embedding"] for item in data], dtype=np.float32)
+
+# ==============================================================================
+# Пресметка
+# ==============================================================================
+
+def load_local_backend(texts=None, refit=False, dimensions=LOCAL_DIMENSIONS, model_file=LOCAL_MODEL_FILE):
+    """
+    Постоечки локален модел, или нов научен на texts (и зачуван).
+    Зачуван модел со друга димензија се учи одново, како и модел чиј речник
+    покрива за повеќе од MAX_VOCABULARY_DRIFT помалку од изменетиот корпус.
+    """
+    model_file = Path(model_file)
+    if model_file.exists() and not refit:
+        backend = LocalEmbeddingBackend.load(model_file)
+        if backend.dimensions != dimensions:
+            print(f"⚠️  Зачуваниот модел има {backend.dimensions} димензии (бараат се {dimensions}), се учи одново")
+        elif texts is None or backend.fingerprint == corpus_fingerprint(texts):
+            return backend
+        else:
+            coverage = backend.vocabulary_coverage(texts)
+            baseline = coverage if backend.coverage is None else backend.coverage
+            if baseline - coverage <= MAX_VOCABULARY_DRIFT:
+                print(f"ℹ️  Корпусот е изменет, речникот покрива {coverage:.1%} "
+                      f"(при учење {baseline:.1%}): моделот се задржува")
+                return backend
+            print(f"⚠️  Корпусот е изменет, речникот покрива {coverage:.1%} "
+                  f"(при учење {baseline:.1%}): се учи одново")
+    if texts is None:
+        raise ValueError("Нема текстови за учење на локалниот модел")
+    backend = LocalEmbeddingBackend().fit(texts, dimensions)
+    backend.save(model_file)
+    return backend
+
+
+# Име → фабрика (backend, тексти за учење, аргументи од CLI)
+BACKENDS = {
+    "local": lambda texts, args: load_local_backend(texts, args.refit, args.dimensions),
+    "openai": lambda texts, args: OpenAIEmbeddingBackend(args.model),
+}
+
+
+def embed_texts(texts, backend, batch_size=BATCH_SIZE):
+    """Сите текстови во пакети → float32 матрица (ред по текст)"""
+    batches = [backend.embed(texts[start:start + batch_size])
+               for start in range(0, len(texts), batch_size)]
+    if not batches:
+        return np.zeros((0, getattr(backend, "dimensions", 0)), dtype=np.float32)
+    return np.vstack(batches).astype(np.float32, copy=False)
+
+
+def write_embeddings(matrix, ids, backend, matrix_file=EMBEDDINGS_FILE, map_file=EMBEDDINGS_MAP_FILE):
+    """Матрица (row-major float32) + JSON со модел, облик и ред → id на chunk"""
+    matrix_file = Path(matrix_file)
+    map_file = Path(map_file)
+    matrix_file.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_file = matrix_file.with_name(matrix_file.name + ".tmp")
+    np.ascontiguousarray(matrix, dtype=np.float32).tofile(tmp_file)
+    os.replace(tmp_file, matrix_file)
+
+    tmp_file = map_file.with_name(map_file.name + ".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            "backend": backend.name,
+            "model": backend.model_id,
+            "dtype": "float32",
+            "rows": int(matrix.shape[0]),
+            "dimensions": int(matrix.shape[1]),
+            "ids": list(ids)
+        }, f, ensure_ascii=False)
+    os.replace(tmp_file, map_file)
+
+
+def load_embeddings(matrix_file=EMBEDDINGS_FILE, map_file=EMBEDDINGS_MAP_FILE):
+    """(memory-mapped матрица, мапа)"""
+    with open(map_file, 'r', encoding='utf-8') as f:
+        mapping = json.load(f)
+    matrix = np.memmap(matrix_file, dtype=np.float32, mode="r",
+                       shape=(mapping["rows"], mapping["dimensions"]))
+    return matrix, mapping
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding вектори за KB chunks")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="local", help="backend за embeddings")
+    parser.add_argument("--chunks", type=Path, default=CHUNKS_FILE, help="NDJSON со chunks (chunk_kb.py)")
+    parser.add_argument("--output", type=Path, default=EMBEDDINGS_FILE,
+                        help="float32 матрица; мапата е до неа со наставка .json")
+    parser.add_argument("--dimensions", type=int, default=LOCAL_DIMENSIONS, help="димензија (local)")
+    parser.add_argument("--refit", action="store_true", help="научи го локалниот модел одново")
+    parser.add_argument("--model", default=None, help="модел за openai backend")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="текстови по пакет")
+    parser.add_argument("--no-cache", action="store_true", help="без кеш на embeddings")
+    parser.add_argument("--cache-size-mb", type=float, default=MAX_CACHE_BYTES / 1024 / 1024,
+                        help="максимална големина на кешот (LRU)")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("🧬 EMBEDDING НА KB CHUNKS")
+    print("=" * 80)
+
+    chunks = list(iter_chunks(args.chunks))
+    texts = [chunk["content"] for chunk in chunks]
+    ids = [chunk["id"] for chunk in chunks]
+
+    started = time.perf_counter()
+    backend = BACKENDS[args.backend](texts, args)
+    prepared = time.perf_counter()
+    if args.no_cache:
+        matrix = embed_texts(texts, backend, args.batch_size)
+    else:
+        with EmbeddingCache(max_bytes=int(args.cache_size_mb * 1024 * 1024)) as cache:
+            matrix = embed_texts(texts, CachedBackend(backend, cache), args.batch_size)
+        print(f"🗄️  Кеш: {format_stats(cache.stats)}")
+    elapsed = time.perf_counter() - started
+
+    map_file = args.output.with_suffix(".json")
+    write_embeddings(matrix, ids, backend, args.output, map_file)
+
+    print(f"📋 Chunks: {len(chunks)}, модел: {backend.model_id}")
+    print(f"⏱️  Модел: {prepared - started:.2f} с, вкупно: {elapsed:.2f} с")
+    print(f"📦 Матрица: {args.output} ({matrix.shape[0]} × {matrix.shape[1]} float32)")
+    print(f"📦 Мапа: {map_file}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except FileNotFoundError as e:
+        print(f"❌ Грешка: Фајлот не постои: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Грешка: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Кеш на диск за embedding вектори
+Клуч: (id на модел, SHA-256 на нормализираниот текст на chunk), па
+непроменет текст не се праќа повторно на embedding - по ажурирање на
+тарифата се пресметуваат само изменетите chunks. Кешот е SQLite со
+ограничена големина: кога ќе се надмине, се бришат најдавно користените
+вектори (LRU). Статистиката (погодоци, промашувања, исфрлени) се печати
+по секое градење.
+
+Кеш: kb/.cache/embeddings.sqlite
+Употреба: python kb/scripts/embedding_cache.py [--clear] [--max-size-mb N]
+"""
+
+import argparse
+import hashlib
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+
+CACHE_FILE = Path(__file__).parent.parent / ".cache" / "embeddings.sqlite"
+
+# Максимална големина на векторите во кешот
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+# SQLite лимит на параметри по барање
+LOOKUP_BATCH = 500
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Текст за клучот: NFC и склопени празни места (разликите во форматирање не се нов текст)"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite кеш (модел, хеш на текст) → float32 вектор, со LRU исфрлање по големина"""
+
+    def __init__(self, path=CACHE_FILE, max_bytes=MAX_CACHE_BYTES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used INTEGER NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+        # Лимитот важи и кога ништо ново не се запишува (пр. намален max_bytes)
+        self.evict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def get_many(self, model, hashes):
+        """{хеш: вектор} за хешовите што се во кешот (и ги означува како користени)"""
+        hashes = list(dict.fromkeys(hashes))
+        found = {}
+        for i in range(0, len(hashes), LOOKUP_BATCH):
+            batch = hashes[i:i + LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            for key, vector in self.db.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                [model, *batch]
+            ):
+                found[key] = np.frombuffer(vector, dtype=np.float32)
+
+        now = time.time_ns()
+        self.db.executemany("UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                            ((now, model, key) for key in found))
+        self.db.commit()
+        self.stats["hits"] += len(found)
+        self.stats["misses"] += len(hashes) - len(found)
+        return found
+
+    def put_many(self, model, items):
+        """
+        Зачувај (хеш, вектор) парови. Најстарите вектори се исфрлаат пред
+        запишувањето, за да има место за пакетот; самиот пакет никогаш не се
+        исфрла (пакет поголем од лимитот останува цел до следното запишување).
+        """
+        now = time.time_ns()
+        vectors = {key: np.ascontiguousarray(vector, dtype=np.float32).tobytes() for key, vector in items}
+        self.evict(self.max_bytes - sum(map(len, vectors.values())), model, vectors.keys())
+        rows = [(model, key, vector, now) for key, vector in vectors.items()]
+        self.db.executemany("""
+            INSERT OR REPLACE INTO embeddings (model, text_hash, vector, size, last_used)
+            VALUES (?, ?, ?, length(?3), ?)
+        """, rows)
+        self.db.commit()
+        self.stats["stored"] += len(rows)
+
+    def size(self):
+        """(број на вектори, бајти)"""
+        count, total = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings").fetchone()
+        return count, total
+
+    def evict(self, max_bytes=None, model=None, keep=()):
+        """
+        Избриши ги најдавно користените вектори додека кешот не падне под лимитот.
+        Хешовите keep на model не се бришат и не се бројат во големината.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        keep = set(keep)
+        excess = self.size()[1] - max_bytes
+        keys = list(keep)
+        for i in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[i:i + LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            excess -= self.db.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                [model, *batch]
+            ).fetchone()[0]
+        if excess <= 0:
+            return 0
+
+        victims = []
+        for victim_model, key, size in self.db.execute(
+            "SELECT model, text_hash, size FROM embeddings ORDER BY last_used"
+        ):
+            if victim_model == model and key in keep:
+                continue
+            victims.append((victim_model, key))
+            excess -= size
+            if excess <= 0:
+                break
+        self.db.executemany("DELETE FROM embeddings WHERE model = ? AND text_hash = ?", victims)
+        self.db.commit()
+        self.stats["evicted"] += len(victims)
+        return len(victims)
+
+    def clear(self):
+        self.db.execute("DELETE FROM embeddings")
+        self.db.commit()
+
+
+class CachedBackend:
+    """Обвивка околу embedding backend: пресметува само текстовите што ги нема во кешот"""
+
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+        self.name = backend.name
+        self.model_id = backend.model_id
+
+    @property
+    def dimensions(self):
+        return self.backend.dimensions
+
+    def embed(self, texts):
+        hashes = [text_hash(text) for text in texts]
+        vectors = self.cache.get_many(self.model_id, hashes)
+
+        # Секој нов текст се пресметува еднаш, и кога се повторува во пакетот
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        if missing:
+            computed = self.backend.embed(list(missing.values()))
+            new = dict(zip(missing, computed))
+            self.cache.put_many(self.model_id, new.items())
+            vectors.update(new)
+
+        return np.vstack([vectors[key] for key in hashes]).astype(np.float32, copy=False)
+
+
+def format_stats(stats):
+    total = stats["hits"] + stats["misses"]
+    rate = stats["hits"] / total * 100 if total else 0
+    return (f"погодоци: {stats['hits']}, промашувања: {stats['misses']} ({rate:.1f}% од кеш), "
+            f"зачувани: {stats['stored']}, исфрлени: {stats['evicted']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Состојба и одржување на кешот за embeddings")
+    parser.add_argument("--clear", action="store_true", help="испразни го кешот")
+    parser.add_argument("--max-size-mb", type=float, default=None, help="исфрли (LRU) до оваа големина")
+    args = parser.parse_args()
+
+    with EmbeddingCache() as cache:
+        if args.clear:
+            cache.clear()
+            print("🗑️  Кешот е испразнет")
+        if args.max_size_mb is not None:
+            evicted = cache.evict(int(args.max_size_mb * 1024 * 1024))
+            print(f"♻️  Исфрлени: {evicted}")
+
+        count, total = cache.size()
+        print(f"📦 {CACHE_FILE}: {count} вектори, {total / 1024 / 1024:.2f} MB")
+        for model, model_count in cache.db.execute(
+            "SELECT model, COUNT(*) FROM embeddings GROUP BY model ORDER BY model"
+        ):
+            print(f"  {model}: {model_count}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Грешка: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
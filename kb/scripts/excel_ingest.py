@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Заеднички engine за импорт на Excel извори во JSON
+Секој извор е опишан со декларативна спецификација (workbook, листови,
+мапирање на колони), а повеќе workbooks/листови се парсираат паралелно.
+
+Спецификација (dict):
+    name          - логичко име на изворот
+    workbook      - патека до .xlsx фајлот
+    sheets        - листа на листови за читање
+    output        - патека до излезниот JSON
+    columns       - листа од (поле, индекс на колона, конвертор); првото поле е клуч
+    keyLength     - (опц.) задолжителна должина на клучот
+    constants     - (опц.) фиксни полиња додадени на секој запис
+    artifacts     - (опц.) функции (records) -> None за дополнителни излези
+    progressEvery - (опц.) колку често да се печати напредок
+
+Употреба: python kb/scripts/excel_ingest.py [--workers N] [--only taric regulations]
+"""
+
+import openpyxl
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# ==============================================================================
+# Конвертори за вредности од ќелии
+# ==============================================================================
+
+def as_text(value):
+    """Текст без празни места; празен стринг ако ќелијата е празна"""
+    return str(value or "").strip()
+
+def as_optional_text(value):
+    """Текст без празни места; None ако ќелијата е празна"""
+    return str(value).strip() if value else None
+
+def as_nonempty_text(value):
+    """Текст без празни места; None ако по чистењето е празен"""
+    return str(value or "").strip() or None
+
+def as_float(value):
+    """Децимален број; None ако ќелијата е празна"""
+    return float(value) if value else None
+
+# ==============================================================================
+# Мапирање и читање
+# ==============================================================================
+
+def map_row(spec, values):
+    """Мапира еден ред (values_only) според спецификацијата, или None ако клучот е невалиден"""
+    columns = spec["columns"]
+    key_field, key_index, key_convert = columns[0]
+    key = key_convert(values[key_index])
+
+    # Прескокни ако нема клуч или должината не одговара
+    key_length = spec.get("keyLength")
+    if not key or (key_length and len(key) != key_length):
+        return None
+
+    record = {key_field: key}
+    for field, index, convert in columns[1:]:
+        record[field] = convert(values[index])
+    record.update(spec.get("constants", {}))
+    return record
+
+def iter_records(spec, sheet, stats, verbose=True):
+    """
+    Генератор на записи од еден лист на workbook-от.
+    stats ({"records", "skipped"}) се ажурира во место.
+    """
+    progress_every = spec.get("progressEvery", 1000)
+
+    if verbose:
+        print(f"📂 Отварање: {spec['workbook']} [{sheet}]")
+    wb = openpyxl.load_workbook(spec["workbook"], read_only=True, data_only=True)
+    try:
+        ws = wb[sheet]
+
+        if verbose:
+            print(f"📊 Вкупно редови: {ws.max_row}")
+            headers = next(ws.iter_rows(max_row=1, values_only=True), ())
+            print(f"📋 Колони: {', '.join(str(h) for h in headers[:8])}")
+
+        for i, values in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+            try:
+                record = map_row(spec, values)
+            except Exception as e:
+                if verbose:
+                    print(f"  ⚠️  Грешка на ред {i}: {e}")
+                stats["skipped"] += 1
+                continue
+
+            if record is None:
+                stats["skipped"] += 1
+                continue
+
+            # Progress
+            if verbose and i % progress_every == 0:
+                print(f"  ⏳ Процесирани: {i-1} редови...")
+
+            stats["records"] += 1
+            yield record
+    finally:
+        wb.close()
+
+def parse_sheet(spec, sheet, verbose=True):
+    """Парсира цел лист; враќа (записи, статистика)"""
+    stats = {"records": 0, "skipped": 0}
+    records = list(iter_records(spec, sheet, stats, verbose))
+    return records, stats
+
+def write_records(records, output_file):
+    """Зачувај записи во JSON (ист формат како оригиналните скрипти)"""
+    output_file = Path(output_file)
+    output_file.parent.mkdir(exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+
+def write_outputs(spec, records):
+    """Запиши го JSON излезот и сите дополнителни артефакти на изворот"""
+    write_records(records, spec["output"])
+    for write_artifact in spec.get("artifacts", ()):
+        write_artifact(records)
+
+def ingest_source(spec, verbose=True):
+    """Импортира еден извор (сите листови по ред) и го запишува излезот"""
+    records = []
+    skipped = 0
+    for sheet in spec["sheets"]:
+        sheet_records, stats = parse_sheet(spec, sheet, verbose)
+        records.extend(sheet_records)
+        skipped += stats["skipped"]
+
+    if verbose:
+        print(f"\n💾 Зачувување во: {spec['output']}")
+    write_outputs(spec, records)
+
+    return {
+        "name": spec["name"],
+        "output": str(spec["output"]),
+        "records": len(records),
+        "skipped": skipped,
+        "examples": records[:3]
+    }
+
+# ==============================================================================
+# Паралелен импорт на повеќе извори
+# ==============================================================================
+
+def _parse_task(task):
+    spec, sheet = task
+    started = time.perf_counter()
+    records, stats = parse_sheet(spec, sheet, verbose=False)
+    stats["seconds"] = time.perf_counter() - started
+    return records, stats
+
+def ingest_sources(specs, workers=None):
+    """
+    Парсира ги сите (извор, лист) парови паралелно во process pool,
+    па ги спојува листовите по редослед и го запишува секој излез.
+    """
+    tasks = [(spec, sheet) for spec in specs for sheet in spec["sheets"]]
+    workers = min(workers or os.cpu_count() or 1, len(tasks)) or 1
+
+    print(f"⚙️  {len(tasks)} листови од {len(specs)} извори, {workers} процеси")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parsed = list(pool.map(_parse_task, tasks))
+
+    results = []
+    position = 0
+    for spec in specs:
+        records = []
+        skipped = 0
+        seconds = 0.0
+        for sheet in spec["sheets"]:
+            sheet_records, stats = parsed[position]
+            position += 1
+            records.extend(sheet_records)
+            skipped += stats["skipped"]
+            seconds += stats["seconds"]
+
+        write_outputs(spec, records)
+        results.append({
+            "name": spec["name"],
+            "output": str(spec["output"]),
+            "records": len(records),
+            "skipped": skipped,
+            "seconds": seconds
+        })
+    return results
+
+def load_sources():
+    """Регистар на сите Excel извори за KB"""
+    from import_taric import TARIC_SOURCE
+    from import_regulations import REGULATIONS_SOURCE
+    return {spec["name"]: spec for spec in (TARIC_SOURCE, REGULATIONS_SOURCE)}
+
+def main():
+    sources = load_sources()
+
+    parser = argparse.ArgumentParser(description="Паралелен импорт на сите Excel извори за KB")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="број на процеси (стандардно: сите јадра)")
+    parser.add_argument("--only", nargs="+", choices=sorted(sources),
+                        help="импортирај само наведените извори")
+    args = parser.parse_args()
+
+    specs = [sources[name] for name in (args.only or sources)]
+
+    print("=" * 80)
+    print("📥 ИМПОРТ НА EXCEL ИЗВОРИ")
+    print("=" * 80)
+
+    started = time.perf_counter()
+    results = ingest_sources(specs, args.workers)
+
+    print(f"\n✅ Завршено за {time.perf_counter() - started:.2f}s:")
+    for result in results:
+        print(f"   └─ {result['name']:12s}: {result['records']} записи, "
+              f"{result['skipped']} прескокнати ({result['seconds']:.2f}s) → {result['output']}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except FileNotFoundError as e:
+        print(f"❌ Грешка: Фајлот не постои: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Грешка: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -5,79 +5,84 @@
 Извлекува Box 15а (Шифра на земја) и Box 29 (Царински органи)
 """
 
-import PyPDF2
-import re
 import json
 import os
+from functools import lru_cache
+from pathlib import Path
 
-def extract_countries_from_pdf():
-    """Извлечи ги земјите од Правилникот (страници 37-42)"""
-    pdf_path = "kb/Raw_Files/ПРАВИЛНИК ЗА НАЧИНОТ НА ПОПОЛНУВАЊЕ НА ЦАРИНСКАТА ДЕКЛАРАЦИЈА.pdf"
+from codelist_extractor import CodelistExtractor
+from pdf_text import extract_pages
+
+KB_DIR = Path(__file__).parent.parent
+PRAVILNIK_PDF = KB_DIR / "Raw_Files" / "ПРАВИЛНИК ЗА НАЧИНОТ НА ПОПОЛНУВАЊЕ НА ЦАРИНСКАТА ДЕКЛАРАЦИЈА.pdf"
+
+
+def handle_country(match):
+    """Box 15а: "Име на земја    XX XX XX XX" (пр. "Албанија    AL AL AL AL")"""
+    country_name = match.group("country_name").strip()
+    country_code = match.group("country_code")
     
-    countries = []
+    # Прескокни нерелевантни совпаѓања
+    if len(country_name) < 3 or len(country_name) > 60:
+        return None
+    if country_code in ["BR", "CI", "IO"]:  # Веќе обработени
+        return None
     
-    with open(pdf_path, 'rb') as file:
-        reader = PyPDF2.PdfReader(file)
-        
-        # Страници 37-42 (индекси 36-41)
-        for page_num in range(36, 42):
-            page = reader.pages[page_num]
-            text = page.extract_text()
-            
-            # Барај шеми: "Име на земја    XX XX XX XX"
-            # Пример: "Албанија    AL AL AL AL"
-            pattern = r'([А-ШЃЌЈЏЧЖЊЉ][а-шѓќјџчжњљ\s\(\)]+?)\s{2,}([A-Z]{2})\s+\2\s+\2\s+\2'
-            
-            for match in re.finditer(pattern, text):
-                country_name = match.group(1).strip()
-                country_code = match.group(2)
-                
-                # Прескокни нерелевантни совпаѓања
-                if len(country_name) < 3 or len(country_name) > 60:
-                    continue
-                if country_code in ["BR", "CI", "IO"]:  # Веќе обработени
-                    continue
-                
-                countries.append({
-                    "code": country_code,
-                    "descriptionMK": country_name,
-                    "boxNumber": "15а"
-                })
+    return {
+        "code": country_code,
+        "descriptionMK": country_name,
+        "boxNumber": "15а"
+    }
+
+
+def handle_customs_office(match):
+    """Box 29: "Царинска испостава СКОПЈЕ 1 MK001010" """
+    office_type = match.group("office_type")
+    office_name = match.group("office_name").strip()
+    office_code = match.group("office_code")
+    
+    full_name = f"{office_type} {office_name}".strip()
     
-    return countries
+    return {
+        "code": office_code,
+        "descriptionMK": full_name,
+        "boxNumber": "29"
+    }
+
+
+# Регистар на шеми по Box; нов прилог од Правилникот = нова регистрација
+EXTRACTOR = CodelistExtractor()
+EXTRACTOR.register(
+    "box15a",
+    r'(?P<country_name>[А-ШЃЌЈЏЧЖЊЉ][а-шѓќјџчжњљ\s\(\)]+?)\s{2,}(?P<country_code>[A-Z]{2})'
+    r'\s+(?P=country_code)\s+(?P=country_code)\s+(?P=country_code)',
+    handle_country,
+    pages=range(36, 42)  # Страници 37-42
+)
+EXTRACTOR.register(
+    "box29",
+    r'(?P<office_type>Царинска испостава|Царинарница|ЦЕНТРАЛНА УПР[АA])\s+'
+    r'(?P<office_name>[А-ШЃЌЈЏЧЖЊЉ\s\.0-9–-]+?)\s+(?P<office_code>MK\d{6})',
+    handle_customs_office,
+    pages=range(47, 50)  # Страници 48-49
+)
+
+
+@lru_cache(maxsize=None)
+def extract_codelists_from_pdf():
+    """Сите регистрирани шифрарници од Правилникот во едно поминување по страница"""
+    pages = extract_pages(PRAVILNIK_PDF, EXTRACTOR.pages())
+    return EXTRACTOR.extract(pages)
+
+
+def extract_countries_from_pdf():
+    """Извлечи ги земјите од Правилникот (страници 37-42)"""
+    return list(extract_codelists_from_pdf()["box15a"])
 
 
 def extract_customs_offices_from_pdf():
     """Извлечи ги царинските органи од Правилникот (страници 48-49)"""
-    pdf_path = "kb/Raw_Files/ПРАВИЛНИК ЗА НАЧИНОТ НА ПОПОЛНУВАЊЕ НА ЦАРИНСКАТА ДЕКЛАРАЦИЈА.pdf"
-    
-    offices = []
-    
-    with open(pdf_path, 'rb') as file:
-        reader = PyPDF2.PdfReader(file)
-        
-        # Страници 48-49
-        for page_num in range(47, 50):
-            page = reader.pages[page_num]
-            text = page.extract_text()
-            
-            # Барај шеми: "Царинска испостава СКОПЈЕ 1 MK001010"
-            pattern = r'(Царинска испостава|Царинарница|ЦЕНТРАЛНА УПР[АA])\s+([А-ШЃЌЈЏЧЖЊЉ\s\.0-9–-]+?)\s+(MK\d{6})'
-            
-            for match in re.finditer(pattern, text):
-                office_type = match.group(1)
-                office_name = match.group(2).strip()
-                office_code = match.group(3)
-                
-                full_name = f"{office_type} {office_name}".strip()
-                
-                offices.append({
-                    "code": office_code,
-                    "descriptionMK": full_name,
-                    "boxNumber": "29"
-                })
-    
-    return offices
+    return list(extract_codelists_from_pdf()["box29"])
 
 
 def create_comprehensive_codelists():
@@ -136,7 +141,7 @@ def create_comprehensive_codelists():
     print(f"   └─ Царински органи (Box 29): {len(customs_offices)} кодови")
     
     # Зачувај во засебни фајлови
-    output_dir = "kb/processed"
+    output_dir = KB_DIR / "processed"
     
     countries_file = os.path.join(output_dir, "countries_box15a.json")
     with open(countries_file, 'w', encoding='utf-8') as f:
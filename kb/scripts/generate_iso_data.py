@@ -5,8 +5,13 @@
 Извор: ISO 3166-1 alpha-2 (земји) + ISO 4217 (валути)
 """
 
-import json
-import os
+from pathlib import Path
+
+from artifact_store import write_json
+
+OUTPUT_DIR = Path(__file__).parent.parent / "processed"
+CURRENCIES_FILE = OUTPUT_DIR / "currencies_box22_iso.json"
+COUNTRIES_FILE = OUTPUT_DIR / "countries_box15a_iso.json"
 
 # ==============================================================================
 # ISO 4217 - ВАЛУТИ (најчести 50+)
@@ -123,29 +128,29 @@ def main():
         country["sortOrder"] = i + 1
     
     # Зачувај валути
-    with open("kb/processed/currencies_box22_iso.json", 'w', encoding='utf-8') as f:
-        json.dump({
-            "listType": "Box22_Currency",
-            "boxNumber": "22",
-            "totalCodes": len(currencies),
-            "codes": currencies
-        }, f, ensure_ascii=False, indent=2)
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    written = {}
+    written[CURRENCIES_FILE] = write_json(CURRENCIES_FILE, {
+        "listType": "Box22_Currency",
+        "boxNumber": "22",
+        "totalCodes": len(currencies),
+        "codes": currencies
+    })
     
     # Зачувај земји
-    with open("kb/processed/countries_box15a_iso.json", 'w', encoding='utf-8') as f:
-        json.dump({
-            "listType": "Box15a_CountryCode",
-            "boxNumber": "15а",
-            "totalCodes": len(key_countries),
-            "codes": key_countries
-        }, f, ensure_ascii=False, indent=2)
+    written[COUNTRIES_FILE] = write_json(COUNTRIES_FILE, {
+        "listType": "Box15a_CountryCode",
+        "boxNumber": "15а",
+        "totalCodes": len(key_countries),
+        "codes": key_countries
+    })
     
     print(f"\n✅ Креирани:")
     print(f"   └─ Валути (Box 22): {len(currencies)} кодови")
     print(f"   └─ Земји (Box 15а): {len(key_countries)} кодови")
     print(f"\n💾 Зачувано во:")
-    print(f"   └─ kb/processed/currencies_box22_iso.json")
-    print(f"   └─ kb/processed/countries_box15a_iso.json")
+    for path, changed in written.items():
+        print(f"   └─ {path}" + ("" if changed else " (непроменето, не е препишано)"))
     
     print(f"\n📋 Примери валути:")
     for c in currencies[:10]:
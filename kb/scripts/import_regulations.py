@@ -3,15 +3,18 @@
 Script за импорт на Регулативи од Excel во JSON формат
 Извор: kb/Raw_Files/Spisok na Regulativi KN 15.xlsx
 Output: kb/processed/regulations_data.json
+        kb/processed/regulations_prefix_index.json (види tariff_index.py)
+        kb/processed/regulations_search_index.json (BM25, види regulation_search.py)
 """
 
-import openpyxl
-import json
 import sys
-import re
 from pathlib import Path
 from datetime import datetime
 
+from excel_ingest import as_nonempty_text, as_text, ingest_source
+from regulation_search import REGULATIONS_SEARCH_FILE, write_search_index
+from tariff_index import REGULATIONS_INDEX_FILE, write_regulation_index
+
 def parse_date(date_str):
     """Парсирај датум од формат 'број/година'"""
     if not date_str:
@@ -31,83 +34,51 @@ def clean_tariff(tariff_str):
         return None
     return tariff_str.replace(' ', '').strip()
 
+def tariff_cell(value):
+    """Конвертор за колоната со тарифна ознака"""
+    return clean_tariff(str(value or "").strip())
+
+def gazette_date_cell(value):
+    """Конвертор: датум на стапување во сила од референцата на Службен весник"""
+    return parse_date(str(value or "").strip())
+
+# Мапирање на колони (види excel_ingest.py)
+REGULATIONS_SOURCE = {
+    "name": "regulations",
+    "workbook": Path(__file__).parent.parent / "Raw_Files" / "Spisok na Regulativi KN 15.xlsx",
+    "sheets": ['Sheet1'],
+    "output": Path(__file__).parent.parent / "processed" / "regulations_data.json",
+    "columns": [
+        ("celexNumber", 0, as_text),
+        ("officialGazetteRef", 1, as_nonempty_text),
+        ("tariffNumber", 5, tariff_cell),
+        ("descriptionEN", 2, as_nonempty_text),
+        ("descriptionMK", 3, as_nonempty_text),
+        ("legalBasis", 4, as_nonempty_text),
+        ("effectiveDate", 1, gazette_date_cell),
+    ],
+    "constants": {"isActive": True},
+    "artifacts": [write_regulation_index, write_search_index],
+    "progressEvery": 200
+}
+
 def import_regulations():
     """Импортира регулативи од Excel"""
     
-    # Патеки
-    excel_file = Path(__file__).parent.parent / "Raw_Files" / "Spisok na Regulativi KN 15.xlsx"
-    output_file = Path(__file__).parent.parent / "processed" / "regulations_data.json"
-    
-    # Креирај processed фолдер
-    output_file.parent.mkdir(exist_ok=True)
-    
-    print(f"📂 Отварање: {excel_file}")
-    wb = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
-    ws = wb['Sheet1']
-    
-    print(f"📊 Вкупно редови: {ws.max_row}")
-    
-    # Прочитај хедери
-    headers = [cell.value for cell in next(ws.iter_rows(max_row=1))]
-    
-    # Мапирање на колони
-    regulation_records = []
-    skipped = 0
-    
-    for i, row in enumerate(ws.iter_rows(min_row=2), start=2):
-        try:
-            # Извлечи податоци
-            celex = str(row[0].value or "").strip()
-            
-            # Прескокни ако нема CELEX
-            if not celex:
-                skipped += 1
-                continue
-            
-            gazette_ref = str(row[1].value or "").strip()
-            desc_en = str(row[2].value or "").strip()
-            desc_mk = str(row[3].value or "").strip()
-            legal_basis = str(row[4].value or "").strip()
-            tariff = clean_tariff(str(row[5].value or "").strip())
-            
-            record = {
-                "celexNumber": celex,
-                "officialGazetteRef": gazette_ref if gazette_ref else None,
-                "tariffNumber": tariff,
-                "descriptionEN": desc_en if desc_en else None,
-                "descriptionMK": desc_mk if desc_mk else None,
-                "legalBasis": legal_basis if legal_basis else None,
-                "effectiveDate": parse_date(gazette_ref),
-                "isActive": True
-            }
-            
-            regulation_records.append(record)
-            
-            # Progress
-            if i % 200 == 0:
-                print(f"  ⏳ Процесирани: {i-1} редови...")
-        
-        except Exception as e:
-            print(f"  ⚠️  Грешка на ред {i}: {e}")
-            skipped += 1
-            continue
-    
-    wb.close()
-    
-    # Зачувај во JSON
-    print(f"\n💾 Зачувување во: {output_file}")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(regulation_records, f, ensure_ascii=False, indent=2)
+    output_file = REGULATIONS_SOURCE["output"]
+    result = ingest_source(REGULATIONS_SOURCE)
     
     # Статистика
-    print(f"\n✅ Успешно импортирани: {len(regulation_records)} записи")
-    print(f"⚠️  Прескокнати: {skipped} записи")
+    print(f"\n✅ Успешно импортирани: {result['records']} записи")
+    print(f"⚠️  Прескокнати: {result['skipped']} записи")
     print(f"📦 Фајл: {output_file}")
     print(f"📏 Големина: {output_file.stat().st_size / 1024:.2f} KB")
+    print(f"📦 Индекс по тарифна ознака: {REGULATIONS_INDEX_FILE}")
+    print(f"📦 Full-text индекс (BM25): {REGULATIONS_SEARCH_FILE}")
     
     # Примери
     print(f"\n📋 Примери (прва 3 записи):")
-    for rec in regulation_records[:3]:
+    for rec in result['examples']:
         print(f"  {rec['celexNumber']}: Тарифа {rec['tariffNumber']}")
         print(f"    МК: {rec['descriptionMK'][:60]}...")
 
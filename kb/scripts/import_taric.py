@@ -3,96 +3,249 @@
 Script за импорт на TARIC податоци од Excel во JSON формат
 Извор: kb/Raw_Files/TARIC.xlsx
 Output: kb/processed/taric_data.json
+        kb/processed/taric_data.bin (бинарна табела, види tariff_table.py)
+        kb/processed/taric_data.ndjson[.gz] (--stream)
+        kb/processed/taric_delta.json + taric_manifest.json (--incremental)
 """
 
-import openpyxl
+import argparse
+import gzip
+import hashlib
 import json
+import os
 import sys
+from datetime import datetime
 from pathlib import Path
 
+from excel_ingest import (
+    as_float, as_optional_text, as_text, ingest_source, iter_records, map_row
+)
+from tariff_table import TABLE_FILE, write_tariff_table
+
+EXCEL_FILE = Path(__file__).parent.parent / "Raw_Files" / "TARIC.xlsx"
+OUTPUT_FILE = Path(__file__).parent.parent / "processed" / "taric_data.json"
+MANIFEST_FILE = OUTPUT_FILE.with_name("taric_manifest.json")
+DELTA_FILE = OUTPUT_FILE.with_name("taric_delta.json")
+SHEET_NAME = 'Real life data'
+
+# Мапирање на колони (види excel_ingest.py)
+TARIC_SOURCE = {
+    "name": "taric",
+    "workbook": EXCEL_FILE,
+    "sheets": [SHEET_NAME],
+    "output": OUTPUT_FILE,
+    "columns": [
+        ("tariffNumber", 0, as_optional_text),
+        ("tarbr", 1, as_text),
+        ("taroz1", 2, as_text),
+        ("taroz2", 3, as_text),
+        ("taroz3", 4, as_text),
+        ("description", 5, as_text),
+        ("customsRate", 6, as_float),
+        ("unitMeasure", 7, as_optional_text),
+        ("fi", 8, as_optional_text),
+        ("fu", 9, as_optional_text),
+        ("pv", 10, as_optional_text),
+        ("vatRate", 18, as_float),
+        ("ex", 19, as_optional_text),
+    ],
+    "keyLength": 10,
+    "constants": {"isActive": True},
+    "artifacts": [write_tariff_table],
+    "progressEvery": 1000
+}
+
+def parse_taric_row(values):
+    """Мапира еден ред (values_only) во TARIC запис, или None ако нема валидна тарифна ознака"""
+    return map_row(TARIC_SOURCE, values)
+
+def open_ndjson(path, mode='w'):
+    """Отвора NDJSON фајл, со gzip ако патеката завршува на .gz"""
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def read_ndjson(path):
+    """Генератор кој чита NDJSON записи еден по еден"""
+    with open_ndjson(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
 def import_taric():
     """Импортира TARIC податоци од Excel"""
     
-    # Патеки
-    excel_file = Path(__file__).parent.parent / "Raw_Files" / "TARIC.xlsx"
-    output_file = Path(__file__).parent.parent / "processed" / "taric_data.json"
+    output_file = OUTPUT_FILE
+    result = ingest_source(TARIC_SOURCE)
     
-    # Креирај processed фолдер
-    output_file.parent.mkdir(exist_ok=True)
+    # Статистика
+    print(f"\n✅ Успешно импортирани: {result['records']} записи")
+    print(f"⚠️  Прескокнати: {result['skipped']} записи")
+    print(f"📦 Фајл: {output_file}")
+    print(f"📏 Големина: {output_file.stat().st_size / 1024 / 1024:.2f} MB")
+    print(f"📦 Бинарна табела: {TABLE_FILE} ({TABLE_FILE.stat().st_size / 1024 / 1024:.2f} MB)")
     
-    print(f"📂 Отварање: {excel_file}")
-    wb = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
-    ws = wb['Real life data']
+    # Примери
+    print(f"\n📋 Примери (прва 3 записи):")
+    for rec in result['examples']:
+        print(f"  {rec['tariffNumber']}: {rec['description'][:60]}")
+
+def import_taric_stream(output_file=None, compress=False):
+    """
+    Стриминг импорт: секој запис веднаш се запишува како една JSON линија (NDJSON).
+    Меморијата останува константна без оглед на големината на Excel фајлот,
+    а потрошувачите можат да читаат додека импортот сè уште трае.
+    """
     
-    print(f"📊 Вкупно редови: {ws.max_row}")
+    if output_file is None:
+        output_file = OUTPUT_FILE.with_suffix(".ndjson")
+    output_file = Path(output_file)
+    if compress and output_file.suffix != ".gz":
+        output_file = output_file.with_name(output_file.name + ".gz")
+    output_file.parent.mkdir(exist_ok=True)
     
-    # Прочитај хедери
-    headers = [cell.value for cell in next(ws.iter_rows(max_row=1))]
-    print(f"📋 Колони: {', '.join(headers[:8])}")
+    print(f"💾 Стриминг во: {output_file}")
     
-    # Мапирање на колони
-    tariff_records = []
-    skipped = 0
+    stats = {"records": 0, "skipped": 0}
+    examples = []
     
-    for i, row in enumerate(ws.iter_rows(min_row=2), start=2):
-        try:
-            # Извлечи податоци
-            tariff_number = str(row[0].value).strip() if row[0].value else None
+    with open_ndjson(output_file) as f:
+        for record in iter_records(TARIC_SOURCE, SHEET_NAME, stats):
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write("\n")
             
-            # Прескокни ако нема тарифна ознака
-            if not tariff_number or len(tariff_number) != 10:
-                skipped += 1
-                continue
+            if len(examples) < 3:
+                examples.append(record)
             
-            record = {
-                "tariffNumber": tariff_number,
-                "tarbr": str(row[1].value or "").strip(),
-                "taroz1": str(row[2].value or "").strip(),
-                "taroz2": str(row[3].value or "").strip(),
-                "taroz3": str(row[4].value or "").strip(),
-                "description": str(row[5].value or "").strip(),
-                "customsRate": float(row[6].value) if row[6].value else None,
-                "unitMeasure": str(row[7].value or "").strip() if row[7].value else None,
-                "fi": str(row[8].value or "").strip() if row[8].value else None,
-                "fu": str(row[9].value or "").strip() if row[9].value else None,
-                "pv": str(row[10].value or "").strip() if row[10].value else None,
-                "vatRate": float(row[18].value) if row[18].value else None,
-                "ex": str(row[19].value or "").strip() if row[19].value else None,
-                "isActive": True
-            }
-            
-            tariff_records.append(record)
-            
-            # Progress
-            if i % 1000 == 0:
-                print(f"  ⏳ Процесирани: {i-1} редови...")
-        
-        except Exception as e:
-            print(f"  ⚠️  Грешка на ред {i}: {e}")
-            skipped += 1
-            continue
-    
-    wb.close()
+            # Flush за да можат потрошувачите да читаат додека трае импортот
+            if stats["records"] % 1000 == 0:
+                f.flush()
     
-    # Зачувај во JSON
-    print(f"\n💾 Зачувување во: {output_file}")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(tariff_records, f, ensure_ascii=False, indent=2)
+    written = stats["records"]
+    skipped = stats["skipped"]
     
     # Статистика
-    print(f"\n✅ Успешно импортирани: {len(tariff_records)} записи")
+    print(f"\n✅ Успешно импортирани: {written} записи")
     print(f"⚠️  Прескокнати: {skipped} записи")
     print(f"📦 Фајл: {output_file}")
     print(f"📏 Големина: {output_file.stat().st_size / 1024 / 1024:.2f} MB")
     
-    # Примери
     print(f"\n📋 Примери (прва 3 записи):")
-    for rec in tariff_records[:3]:
+    for rec in examples:
         print(f"  {rec['tariffNumber']}: {rec['description'][:60]}")
 
+def record_hash(record):
+    """Хеш од содржината на записот (независен од редоследот на клучевите)"""
+    payload = json.dumps(record, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def load_manifest(manifest_file):
+    """Вчитај манифест {tariffNumber: hash}; празен ако не постои"""
+    if not manifest_file.exists():
+        return {}
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        return json.load(f).get("hashes", {})
+
+def write_json_atomic(path, data, indent=2):
+    """Запиши JSON во привремен фајл и атомски замени го постоечкиот"""
+    tmp_file = path.with_name(path.name + ".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp_file, path)
+
+def import_taric_incremental(manifest_file=None, delta_file=None):
+    """
+    Инкрементален импорт: споредува хеш на секој запис со манифестот од
+    претходното извршување и запишува само разлика (додадени, изменети и
+    деактивирани тарифни ознаки). Манифестот се ажурира на крајот.
+    """
+    
+    manifest_file = Path(manifest_file or MANIFEST_FILE)
+    delta_file = Path(delta_file or DELTA_FILE)
+    delta_file.parent.mkdir(exist_ok=True)
+    
+    previous = load_manifest(manifest_file)
+    print(f"📑 Манифест: {manifest_file} ({len(previous)} ознаки)")
+    
+    stats = {"records": 0, "skipped": 0}
+    current = {}
+    added = {}
+    changed = {}
+    
+    for record in iter_records(TARIC_SOURCE, SHEET_NAME, stats):
+        tariff_number = record["tariffNumber"]
+        digest = record_hash(record)
+        current[tariff_number] = digest
+        
+        # Дупликати во истиот извор: важи последниот ред
+        added.pop(tariff_number, None)
+        changed.pop(tariff_number, None)
+        
+        old_digest = previous.get(tariff_number)
+        if old_digest is None:
+            added[tariff_number] = record
+        elif old_digest != digest:
+            changed[tariff_number] = record
+    
+    skipped = stats["skipped"]
+    
+    deactivated = [
+        {"tariffNumber": tariff_number, "isActive": False}
+        for tariff_number in sorted(set(previous) - set(current))
+    ]
+    
+    delta = {
+        "metadata": {
+            "source": EXCEL_FILE.name,
+            "generated": datetime.now().isoformat(),
+            "baseline": len(previous),
+            "total": len(current),
+            "added": len(added),
+            "changed": len(changed),
+            "deactivated": len(deactivated)
+        },
+        "added": list(added.values()),
+        "changed": list(changed.values()),
+        "deactivated": deactivated
+    }
+    
+    print(f"\n💾 Зачувување на разлика во: {delta_file}")
+    write_json_atomic(delta_file, delta)
+    write_json_atomic(manifest_file, {
+        "generated": delta["metadata"]["generated"],
+        "totalCodes": len(current),
+        "hashes": current
+    }, indent=None)
+    
+    # Статистика
+    print(f"\n✅ Тарифни ознаки во изворот: {len(current)}")
+    print(f"   └─ Додадени: {len(added)}")
+    print(f"   └─ Изменети: {len(changed)}")
+    print(f"   └─ Деактивирани: {len(deactivated)}")
+    print(f"⚠️  Прескокнати: {skipped} записи")
+    print(f"📦 Фајл: {delta_file}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Импорт на TARIC податоци од Excel")
+    parser.add_argument("--stream", action="store_true",
+                        help="стриминг во NDJSON (константна меморија)")
+    parser.add_argument("--gzip", action="store_true",
+                        help="компресирај го NDJSON излезот (само со --stream)")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="патека до излезниот NDJSON фајл (само со --stream)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="запиши само разлика во однос на манифестот од претходниот импорт")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
     try:
-        import_taric()
+        if args.incremental:
+            import_taric_incremental()
+        elif args.stream:
+            import_taric_stream(args.output, compress=args.gzip)
+        else:
+            import_taric()
     except FileNotFoundError as e:
         print(f"❌ Грешка: Фајлот не постои: {e}")
         sys.exit(1)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Заеднички слој за екстракција на текст од PDF по страници
+extract_text() се извршува паралелно (process pool), а текстот на секоја
+страница се кешира на диск по хеш на содржината на PDF-от и број на страница.
+Повторното извршување ги чита страниците од кешот без парсирање на PDF.
+
+Кеш: kb/.cache/pdf_text/<sha256>/<страница>.txt
+Употреба: python kb/scripts/pdf_text.py [--workers N] [PDF ...]
+"""
+
+import PyPDF2
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+KB_DIR = Path(__file__).parent.parent
+RAW_FILES_DIR = KB_DIR / "Raw_Files"
+CACHE_DIR = KB_DIR / ".cache" / "pdf_text"
+
+# Колку страници обработува еден процес одеднаш (PdfReader се отвора по блок)
+PAGES_PER_TASK = 16
+
+
+def file_hash(path):
+    """SHA-256 од содржината на фајлот"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path, text):
+    # Посебен привремен фајл за секој запис: повеќе процеси можат да го кешираат истиот PDF
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=path.parent, prefix=path.name + ".",
+                                     suffix=".tmp", delete=False) as f:
+        f.write(text)
+    try:
+        os.replace(f.name, path)
+    except BaseException:
+        os.unlink(f.name)
+        raise
+
+
+def _extract_task(task):
+    """Отвори го PDF-от еднаш и извлечи блок страници"""
+    pdf_path, page_numbers = task
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [(page_num, reader.pages[page_num].extract_text() or "") for page_num in page_numbers]
+
+
+class PdfTextCache:
+    """Текст по страници за еден PDF, со кеш на диск"""
+
+    def __init__(self, pdf_path, cache_dir=CACHE_DIR):
+        self.pdf_path = Path(pdf_path)
+        self.digest = file_hash(self.pdf_path)
+        self.cache_dir = Path(cache_dir) / self.digest
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._page_count = None
+
+    def _page_file(self, page_num):
+        return self.cache_dir / f"{page_num:05d}.txt"
+
+    @property
+    def page_count(self):
+        """Број на страници (кеширан во meta.json)"""
+        if self._page_count is None:
+            meta_file = self.cache_dir / "meta.json"
+            if meta_file.exists():
+                self._page_count = json.loads(meta_file.read_text(encoding='utf-8'))["pages"]
+            else:
+                with open(self.pdf_path, 'rb') as file:
+                    self._page_count = len(PyPDF2.PdfReader(file).pages)
+                _write_atomic(meta_file, json.dumps({
+                    "source": self.pdf_path.name,
+                    "pages": self._page_count
+                }, ensure_ascii=False))
+        return self._page_count
+
+    def cached_pages(self, pages):
+        """Кои од страниците веќе се во кешот"""
+        return [page_num for page_num in pages if self._page_file(page_num).exists()]
+
+    def iter_extract(self, pages=None, workers=None):
+        """
+        (страница, текст) по редослед на pages, секоја веднаш штом е достапна.
+        Страниците што ги нема во кешот се извлекуваат паралелно по блокови и
+        се зачувуваат пред да се вратат.
+        """
+        if pages is None:
+            pages = range(self.page_count)
+        pages = list(pages)
+
+        cached = set(self.cached_pages(pages))
+        missing = [page_num for page_num in pages if page_num not in cached]
+        tasks = [(str(self.pdf_path), missing[i:i + PAGES_PER_TASK])
+                 for i in range(0, len(missing), PAGES_PER_TASK)]
+        workers = min(workers or os.cpu_count() or 1, len(tasks))
+
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            blocks = pool.map(_extract_task, tasks) if pool is not None else map(_extract_task, tasks)
+            extracted = {}
+            for page_num in pages:
+                if page_num in cached:
+                    yield page_num, self._page_file(page_num).read_text(encoding='utf-8')
+                    continue
+                while page_num not in extracted:
+                    for block_page, text in next(blocks):
+                        _write_atomic(self._page_file(block_page), text)
+                        extracted[block_page] = text
+                yield page_num, extracted.pop(page_num)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    def extract(self, pages=None, workers=None):
+        """Текст на страниците (индекси од 0) како {страница: текст}"""
+        return dict(self.iter_extract(pages, workers))
+
+
+def extract_pages(pdf_path, pages=None, workers=None):
+    """Кратенка: текст на страниците од PDF преку кешот"""
+    return PdfTextCache(pdf_path).extract(pages, workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Екстракција на текст по страници со кеш")
+    parser.add_argument("pdfs", nargs="*", type=Path,
+                        help="PDF фајлови (стандардно: сите во kb/Raw_Files)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="број на процеси (стандардно: сите јадра)")
+    args = parser.parse_args()
+
+    pdfs = args.pdfs or sorted(RAW_FILES_DIR.glob("*.pdf"))
+
+    print("=" * 80)
+    print("📄 ЕКСТРАКЦИЈА НА ТЕКСТ ОД PDF")
+    print("=" * 80)
+
+    for pdf_path in pdfs:
+        cache = PdfTextCache(pdf_path)
+        pages = range(cache.page_count)
+        cached = len(cache.cached_pages(pages))
+        texts = cache.extract(pages, args.workers)
+        characters = sum(len(text) for text in texts.values())
+        print(f"  ✅ {pdf_path.name}: {len(texts)} страници "
+              f"({cached} од кеш), {characters} знаци")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Двојазичен full-text индекс (BM25) над regulations_data.json
+Текстовите descriptionMK, descriptionEN и legalBasis се токенизираат
+(кирилично case folding, латинични букви-двојници во кирилични зборови,
+стоп-зборови) и се скратуваат со лесен stemmer за македонски и англиски.
+Индексот е инвертиран: поим → (документи, тежинска фреквенција). Нормализацијата
+по должина на поле (BM25F) се пресметува при градење, па пребарувањето е
+само збир на idf * tf / (k1 + tf) по поимите од прашањето.
+
+Output: kb/processed/regulations_search_index.json
+Употреба: python kb/scripts/regulation_search.py "прав од школки" [--limit 10] [--rebuild]
+"""
+
+import argparse
+import json
+import math
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+from artifact_store import write_json
+
+PROCESSED_DIR = Path(__file__).parent.parent / "processed"
+REGULATIONS_FILE = PROCESSED_DIR / "regulations_data.json"
+REGULATIONS_SEARCH_FILE = PROCESSED_DIR / "regulations_search_index.json"
+
+# Поле → тежина (legalBasis е долг и шаблонски текст, па носи помалку)
+SEARCH_FIELDS = {
+    "descriptionMK": 1.0,
+    "descriptionEN": 1.0,
+    "legalBasis": 0.5,
+}
+
+# BM25 параметри
+K1 = 1.2
+B = 0.75
+
+# ==============================================================================
+# Токенизација
+# ==============================================================================
+
+_WORD = re.compile(r"[^\W_]+")
+_CYRILLIC = re.compile(r"[а-шѓѕјљњќџѐѝ]")
+
+# Латинични букви што во PDF/Excel текст се појавуваат наместо кирилични
+_LATIN_LOOKALIKES = str.maketrans("aceopxykmhtbj", "асеорхукмнтвј")
+# Акцентирани варијанти → основна буква
+_CYRILLIC_FOLD = str.maketrans("ѐѝ", "еи")
+
+STOPWORDS = frozenset("""
+    и или но а за од до во на со без по при кон низ преку меѓу под над пред зад
+    се е си сме сте сум бил била било биле ќе не да ли што кој која кое кои
+    тоа тој таа тие тука таму овој оваа ова овие оној онаа она оние нивни негов
+    нејзин како кога каде дека ако така исто само уште веќе многу сите секој
+    the a an and or of to in on at by for with from as is are was were be been
+    it its this that these those which who not no than into other such per
+""".split())
+
+# Македонски наставки (член, множина, придавки), од најдолга кон најкратка
+_MK_SUFFIXES = tuple(sorted("""
+    ите ата ото иот ови еви иња ски ска ско ниот ната ното ните
+    от та то те
+    а е и о
+""".split(), key=len, reverse=True))
+
+_EN_SUFFIXES = ("ations", "ation", "ments", "ment", "ings", "ing", "ies", "ied", "es", "ed", "s")
+
+MIN_STEM = 3
+
+
+def fold(word):
+    """Case folding; латинични двојници во кирилични зборови → кирилица"""
+    word = unicodedata.normalize("NFC", word).casefold()
+    if _CYRILLIC.search(word):
+        word = word.translate(_LATIN_LOOKALIKES)
+    return word.translate(_CYRILLIC_FOLD)
+
+
+def stem(word):
+    """Лесно скратување на наставки (го задржува коренот од најмалку MIN_STEM букви)"""
+    suffixes = _MK_SUFFIXES if _CYRILLIC.search(word) else _EN_SUFFIXES
+    for suffix in suffixes:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """Текст → листа на поими (склопени, без стоп-зборови, скратени)"""
+    terms = []
+    for match in _WORD.finditer(text or ""):
+        word = fold(match.group())
+        if len(word) < 2 or word in STOPWORDS:
+            continue
+        terms.append(word if word.isdigit() else stem(word))
+    return terms
+
+# ==============================================================================
+# Индекс
+# ==============================================================================
+
+class RegulationSearchIndex:
+    """Инвертиран BM25F индекс над регулативите"""
+
+    def __init__(self, documents, postings, k1=K1):
+        self.documents = documents
+        self.postings = postings
+        self.k1 = k1
+        count = len(documents)
+        self._idf = {
+            term: math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, (docs, _) in postings.items()
+        }
+
+    def __len__(self):
+        return len(self.documents)
+
+    @classmethod
+    def build(cls, regulations, fields=SEARCH_FIELDS, k1=K1, b=B):
+        """Изгради индекс од записите на regulations_data.json"""
+        field_terms = {field: [tokenize(regulation.get(field)) for regulation in regulations]
+                       for field in fields}
+        average = {field: (sum(map(len, terms)) / len(terms) if terms else 0) or 1
+                   for field, terms in field_terms.items()}
+
+        weighted = {}
+        for doc, _ in enumerate(regulations):
+            for field, weight in fields.items():
+                terms = field_terms[field][doc]
+                if not terms:
+                    continue
+                norm = weight / (1 - b + b * len(terms) / average[field])
+                for term in terms:
+                    scores = weighted.setdefault(term, {})
+                    scores[doc] = scores.get(doc, 0.0) + norm
+
+        postings = {
+            term: (list(scores), [round(tf, 4) for tf in scores.values()])
+            for term, scores in sorted(weighted.items())
+        }
+        documents = [
+            {"celexNumber": regulation.get("celexNumber"), "tariffNumber": regulation.get("tariffNumber")}
+            for regulation in regulations
+        ]
+        return cls(documents, postings, k1)
+
+    def search(self, query, limit=10):
+        """Рангирани погодоци: [(score, индекс на запис, {celexNumber, tariffNumber})]"""
+        scores = {}
+        for term in set(tokenize(query)):
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            idf = self._idf[term]
+            k1 = self.k1
+            for doc, tf in zip(*entry):
+                scores[doc] = scores.get(doc, 0.0) + idf * tf / (k1 + tf)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [(score, doc, self.documents[doc]) for doc, score in ranked]
+
+    def to_json(self):
+        return {
+            "fields": SEARCH_FIELDS,
+            "k1": self.k1,
+            "documents": self.documents,
+            "postings": {term: [docs, tfs] for term, (docs, tfs) in self.postings.items()}
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        postings = {term: (docs, tfs) for term, (docs, tfs) in data["postings"].items()}
+        return cls(data["documents"], postings, data["k1"])
+
+
+def write_search_index(regulations, output_file=REGULATIONS_SEARCH_FILE):
+    """Запиши го full-text индексот на регулативи"""
+    index = RegulationSearchIndex.build(regulations)
+    write_json(output_file, index.to_json())
+    return index
+
+
+def load_search_index(path=REGULATIONS_SEARCH_FILE):
+    """Вчитај го full-text индексот на регулативи"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return RegulationSearchIndex.from_json(json.load(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 пребарување низ регулативите")
+    parser.add_argument("query", nargs="+", help="текст за пребарување (MK или EN)")
+    parser.add_argument("--limit", type=int, default=10, help="број на погодоци")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="изгради го индексот од regulations_data.json")
+    args = parser.parse_args()
+
+    if args.rebuild or not REGULATIONS_SEARCH_FILE.exists():
+        with open(REGULATIONS_FILE, 'r', encoding='utf-8') as f:
+            regulations = json.load(f)
+        index = write_search_index(regulations)
+        print(f"📦 Изграден индекс: {REGULATIONS_SEARCH_FILE} ({len(index)} записи, {len(index.postings)} поими)")
+    else:
+        index = load_search_index()
+
+    query = " ".join(args.query)
+    started = time.perf_counter()
+    hits = index.search(query, args.limit)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    print(f"🔎 \"{query}\" → {tokenize(query)}: {len(hits)} погодоци ({elapsed:.2f} ms)")
+    for score, _, document in hits:
+        print(f"  {score:6.2f}  {document['celexNumber']}  {document['tariffNumber']}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except FileNotFoundError as e:
+        print(f"❌ Грешка: Фајлот не постои: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Грешка: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
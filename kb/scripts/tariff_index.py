@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Хиерархиски индекс по префикс на тарифна ознака
+Глава (2) / тарифен број (4) / подброј (6) / КН (8) / TARIC (10 цифри).
+Сортирани клучеви + bisect за опсези ("сите ознаки под 0307") и
+пребарување по префикс ("кои регулативи важат за 0307998000").
+
+Output: kb/processed/regulations_prefix_index.json
+Употреба: python kb/scripts/tariff_index.py 0307998000 [...]
+"""
+
+import json
+import sys
+from bisect import bisect_left
+from pathlib import Path
+
+from artifact_store import write_json
+
+REGULATIONS_INDEX_FILE = Path(__file__).parent.parent / "processed" / "regulations_prefix_index.json"
+
+TARIFF_LEVELS = {2: "Глава", 4: "Тарифен број", 6: "Тарифен подброј", 8: "КН", 10: "TARIC"}
+
+
+# Должини на ознаките што се појавуваат споени без разделник
+JOINED_LENGTHS = (8, 10)
+
+
+def _segmentations(token):
+    """Сите начини token да се подели на делови од 8 или 10 цифри"""
+    if not token:
+        yield []
+        return
+    for length in JOINED_LENGTHS:
+        if len(token) >= length:
+            for rest in _segmentations(token[length:]):
+                yield [token[:length]] + rest
+
+
+def split_tariff_numbers(value, known=None, unresolved=None):
+    """
+    Раздели поле со тарифни ознаки во листа.
+    Во регулативите има повеќе ознаки одделени со нов ред или споени без
+    разделник (пр. '8714911087149130'). Споените се делат само ако поделбата
+    на 8/10 цифри е еднозначна: ако е дадено known(ознака) → bool (пр.
+    постои во TARIC табелата), се бројат само поделбите со познати делови.
+    Нееднозначните и неделивите токени се прескокнуваат и се додаваат во
+    unresolved (ако е дадена листа).
+    """
+    if not value:
+        return []
+
+    codes = []
+    for token in value.split():
+        if not token.isdigit():
+            continue
+        if len(token) in TARIFF_LEVELS:
+            codes.append(token)
+            continue
+        candidates = [pieces for pieces in _segmentations(token)
+                      if known is None or all(known(piece) for piece in pieces)]
+        if len(candidates) == 1:
+            codes.extend(candidates[0])
+        elif unresolved is not None:
+            unresolved.append(token)
+    return codes
+
+
+def taric_validator(table_file=None):
+    """known(ознака) според бинарната TARIC табела, или None ако табелата ја нема"""
+    from tariff_table import TABLE_FILE, TariffTable
+    table_file = Path(table_file or TABLE_FILE)
+    if not table_file.exists():
+        return None
+    table = TariffTable(table_file)
+    return lambda code: bool(table.codes_under(code))
+
+
+def report_unresolved(unresolved):
+    if unresolved:
+        sample = ", ".join(unresolved[:5])
+        print(f"⚠️  Неразрешени тарифни ознаки ({len(unresolved)}), прескокнати: {sample}")
+
+
+class PrefixIndex:
+    """Сортиран индекс на тарифни ознаки со различна должина и вредности по ознака"""
+
+    def __init__(self, entries=()):
+        self._values = {}
+        for code, value in entries:
+            self._values.setdefault(code, []).append(value)
+        self._codes = sorted(self._values)
+        self._lengths = sorted({len(code) for code in self._codes})
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __contains__(self, code):
+        return code in self._values
+
+    def get(self, code):
+        """Вредности за точно оваа ознака"""
+        return self._values.get(code, [])
+
+    def under(self, prefix):
+        """Сите ознаки што почнуваат со prefix (пр. сите под тарифен број 0307)"""
+        start = bisect_left(self._codes, prefix)
+        # ':' е веднаш по '9' во ASCII, па ја затвора целата гранка
+        end = bisect_left(self._codes, prefix + ":", start)
+        return self._codes[start:end]
+
+    def prefixes_of(self, code):
+        """Сите индексирани ознаки што се префикс на code, од најкратка кон најдолга"""
+        return [code[:length] for length in self._lengths
+                if length <= len(code) and code[:length] in self._values]
+
+    def longest_prefix(self, code):
+        """Најдолгата индексирана ознака што е префикс на code, или None"""
+        for length in reversed(self._lengths):
+            if length <= len(code) and code[:length] in self._values:
+                return code[:length]
+        return None
+
+    def values_for(self, code):
+        """Вредностите на сите префикси на code (без дупликати, по редослед)"""
+        seen = {}
+        for prefix in self.prefixes_of(code):
+            for value in self._values[prefix]:
+                seen.setdefault(value, None)
+        return list(seen)
+
+    def to_json(self):
+        return {"lengths": self._lengths, "entries": {code: self._values[code] for code in self._codes}}
+
+    @classmethod
+    def from_json(cls, data):
+        index = cls()
+        index._values = data["entries"]
+        index._codes = sorted(index._values)
+        index._lengths = data["lengths"]
+        return index
+
+
+def build_regulation_index(regulations, known=None, unresolved=None):
+    """Индекс тарифна ознака → CELEX броеви од regulations_data.json"""
+    return PrefixIndex(
+        (code, regulation["celexNumber"])
+        for regulation in regulations
+        for code in split_tariff_numbers(regulation.get("tariffNumber"), known, unresolved)
+    )
+
+
+def write_regulation_index(regulations, output_file=REGULATIONS_INDEX_FILE):
+    """Запиши го индексот на регулативи по префикс (споените ознаки се проверуваат со TARIC табелата)"""
+    unresolved = []
+    index = build_regulation_index(regulations, taric_validator(), unresolved)
+    report_unresolved(unresolved)
+    write_json(output_file, index.to_json())
+    return index
+
+
+def load_regulation_index(path=REGULATIONS_INDEX_FILE):
+    """Вчитај го индексот на регулативи по префикс"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return PrefixIndex.from_json(json.load(f))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Употреба: python kb/scripts/tariff_index.py <тарифна ознака> [...]")
+        sys.exit(1)
+
+    index = load_regulation_index()
+    print(f"📦 {REGULATIONS_INDEX_FILE} ({len(index)} ознаки)")
+    for code in sys.argv[1:]:
+        matches = index.prefixes_of(code) or index.under(code)
+        if not matches:
+            print(f"  ❌ {code}: нема регулативи")
+            continue
+        for match in matches:
+            level = TARIFF_LEVELS.get(len(match), f"{len(match)} цифри")
+            celex_numbers = index.get(match)
+            more = f" (+{len(celex_numbers) - 10})" if len(celex_numbers) > 10 else ""
+            print(f"  ✅ {code} ← {match} ({level}): {', '.join(celex_numbers[:10])}{more}")
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Бинарна табела на тарифни ознаки (taric_data.bin) за брзо пребарување
+Сортирани 10-цифрени ознаки како цели броеви, стапки како float32 и
+текстуални полиња во заеднички blob со offset индекс. Читачот го мапира
+фајлот во меморија (mmap) и пребарува со binary search, без парсирање.
+
+Формат (little-endian):
+    header   - magic "LONTARF1", верзија, број на записи, број на текст полиња
+    codes    - uint64[n] сортирани тарифни ознаки
+    rates    - float32[n][2] customsRate, vatRate (NaN = None, читање со 4 децимали)
+    offsets  - uint32[n][полиња + 1] почеток на секое поле во blob-от
+    nulls    - uint16[n] битска маска за полиња со вредност None
+    blob     - UTF-8 текст
+
+Употреба: python kb/scripts/tariff_table.py 0307998000 [...]
+"""
+
+import math
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+MAGIC = b"LONTARF1"
+VERSION = 1
+HEADER = struct.Struct("<8sIII")
+
+TEXT_FIELDS = (
+    "tarbr", "taroz1", "taroz2", "taroz3", "description",
+    "unitMeasure", "fi", "fu", "pv", "ex"
+)
+RATE_FIELDS = ("customsRate", "vatRate")
+
+TABLE_FILE = Path(__file__).parent.parent / "processed" / "taric_data.bin"
+
+
+def write_tariff_table(records, output_file=TABLE_FILE):
+    """Запиши бинарна табела од TARIC записи; враќа број на запишани ознаки"""
+    # Дупликати: важи последниот запис
+    by_code = {}
+    for record in records:
+        tariff_number = record["tariffNumber"]
+        if len(tariff_number) != 10 or not tariff_number.isdigit():
+            continue
+        by_code[int(tariff_number)] = record
+    rows = sorted(by_code.items())
+
+    field_count = len(TEXT_FIELDS)
+    codes = array("Q")
+    rates = array("f")
+    offsets = array("I")
+    nulls = array("H")
+    blob = bytearray()
+
+    for code, record in rows:
+        codes.append(code)
+        for field in RATE_FIELDS:
+            value = record.get(field)
+            rates.append(math.nan if value is None else value)
+
+        null_mask = 0
+        for bit, field in enumerate(TEXT_FIELDS):
+            offsets.append(len(blob))
+            value = record.get(field)
+            if value is None:
+                null_mask |= 1 << bit
+            else:
+                blob += value.encode("utf-8")
+        offsets.append(len(blob))
+        nulls.append(null_mask)
+
+    if sys.byteorder != "little":
+        for column in (codes, rates, offsets, nulls):
+            column.byteswap()
+
+    output_file = Path(output_file)
+    output_file.parent.mkdir(exist_ok=True)
+    with open(output_file, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(codes), field_count))
+        f.write(codes.tobytes())
+        f.write(rates.tobytes())
+        f.write(offsets.tobytes())
+        f.write(nulls.tobytes())
+        f.write(blob)
+
+    return len(codes)
+
+
+def _rate(value):
+    """float32 назад во стапка; заокружено за да се отстрани шумот од float32"""
+    return None if math.isnan(value) else round(value, 4)
+
+
+class TariffTable:
+    """Читач на taric_data.bin преку mmap; пребарувањето не вчитува ништо однапред"""
+
+    def __init__(self, path=TABLE_FILE):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic, version, count, field_count = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION or field_count != len(TEXT_FIELDS):
+            raise ValueError(f"Непознат формат на тарифна табела: {path}")
+        if sys.byteorder != "little":
+            raise ValueError("Бинарната табела е поддржана само на little-endian платформи")
+
+        self._count = count
+        stride = field_count + 1
+        position = HEADER.size
+        sections = []
+        for fmt, size in (("Q", count * 8), ("f", count * 8),
+                          ("I", count * stride * 4), ("H", count * 2)):
+            sections.append(view[position:position + size].cast(fmt))
+            position += size
+        self._codes, self._rates, self._offsets, self._nulls = sections
+        self._blob = view[position:]
+        self._stride = stride
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, tariff_number):
+        return self._index(tariff_number) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Ослободи mmap и фајлот"""
+        for view in (self._codes, self._rates, self._offsets, self._nulls, self._blob):
+            view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def _bisect(self, code, low=0):
+        """Прва позиција со ознака >= code (барајќи од low)"""
+        codes = self._codes
+        high = self._count
+        while low < high:
+            middle = (low + high) // 2
+            if codes[middle] < code:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _index(self, tariff_number):
+        """Binary search по тарифна ознака; None ако не постои"""
+        tariff_number = str(tariff_number)
+        if len(tariff_number) != 10 or not tariff_number.isdigit():
+            return None
+        code = int(tariff_number)
+        index = self._bisect(code)
+        if index < self._count and self._codes[index] == code:
+            return index
+        return None
+
+    def codes_under(self, prefix):
+        """
+        Сите 10-цифрени ознаки под префикс (глава 03, тарифен број 0307, ...);
+        празен префикс ги враќа сите ознаки.
+        """
+        prefix = str(prefix)
+        if (prefix and not prefix.isdigit()) or len(prefix) > 10:
+            return []
+        start = self._bisect(int(prefix.ljust(10, "0")))
+        end = self._bisect(int(prefix.ljust(10, "9")) + 1)
+        return [f"{self._codes[i]:010d}" for i in range(start, end)]
+
+    def rates(self, tariff_number):
+        """(customsRate, vatRate) за тарифната ознака, или None ако не постои"""
+        index = self._index(tariff_number)
+        if index is None:
+            return None
+        customs_rate, vat_rate = self._rates[index * 2], self._rates[index * 2 + 1]
+        return _rate(customs_rate), _rate(vat_rate)
+
+    def lookup(self, tariff_number):
+        """Целосен запис во формат на taric_data.json, или None ако не постои"""
+        index = self._index(tariff_number)
+        if index is None:
+            return None
+        return self._record(index)
+
+    def lookup_many(self, tariff_numbers):
+        """
+        Записи за повеќе ознаки во едно поминување: {ознака: запис или None}.
+        Ознаките се сортираат, па секое binary search продолжува од претходната позиција.
+        """
+        result = {}
+        low = 0
+        for tariff_number in sorted({str(tariff_number) for tariff_number in tariff_numbers}):
+            if len(tariff_number) != 10 or not tariff_number.isdigit():
+                result[tariff_number] = None
+                continue
+            code = int(tariff_number)
+            low = self._bisect(code, low)
+            found = low < self._count and self._codes[low] == code
+            result[tariff_number] = self._record(low) if found else None
+        return result
+
+    def _record(self, index):
+        customs_rate = _rate(self._rates[index * 2])
+        vat_rate = _rate(self._rates[index * 2 + 1])
+        record = {"tariffNumber": f"{self._codes[index]:010d}"}
+        base = index * self._stride
+        null_mask = self._nulls[index]
+        for bit, field in enumerate(TEXT_FIELDS):
+            if null_mask & (1 << bit):
+                record[field] = None
+            else:
+                start, end = self._offsets[base + bit], self._offsets[base + bit + 1]
+                record[field] = bytes(self._blob[start:end]).decode("utf-8")
+
+        # Ист редослед на полиња како taric_data.json
+        return {
+            "tariffNumber": record["tariffNumber"],
+            "tarbr": record["tarbr"],
+            "taroz1": record["taroz1"],
+            "taroz2": record["taroz2"],
+            "taroz3": record["taroz3"],
+            "description": record["description"],
+            "customsRate": customs_rate,
+            "unitMeasure": record["unitMeasure"],
+            "fi": record["fi"],
+            "fu": record["fu"],
+            "pv": record["pv"],
+            "vatRate": vat_rate,
+            "ex": record["ex"],
+            "isActive": True
+        }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Употреба: python kb/scripts/tariff_table.py <тарифна ознака> [...]")
+        sys.exit(1)
+
+    with TariffTable() as table:
+        print(f"📦 {TABLE_FILE} ({len(table)} ознаки)")
+        for tariff_number in sys.argv[1:]:
+            record = table.lookup(tariff_number)
+            if record is None:
+                print(f"  ❌ {tariff_number}: не постои")
+            else:
+                print(f"  ✅ {tariff_number}: царина {record['customsRate']}, "
+                      f"ДДВ {record['vatRate']} - {record['description'][:60]}")
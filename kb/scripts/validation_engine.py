@@ -0,0 +1,923 @@
+#!/usr/bin/env python3
+"""
+Компајлер и извршувач на LON валидациски правила (lon_validation_rules.json)
+validationLogic на секое правило се парсира еднаш во дрво од Python функции
+(регуларните изрази се компајлираат, листите на вредности се frozenset),
+па валидацијата на декларација е само повикување на готови предикати.
+
+Поддржани форми:
+    REGEX: <шема>                              - формат на полето
+    IN ('a', 'b')  /  NOT NULL AND LENGTH > 0  - услов врз полето ({value})
+    <услов> WHEN <услов>                       - условно правило
+    EXISTS IN <Табела> WHERE Кол = {value} AND ...
+    MATCH <Табела>.<Кол> WHERE Кол = {Поле}
+    EXISTS <Ентитет> WHERE <Ентитет>Кол = 'x' AND ...
+    <израз> FROM <Табела> WHERE Кол = {Поле}   - пр. SUM(UsedQuantity) + {Quantity} <= TotalQuantity
+
+Резултат на правило: True (исполнето), False (прекршено), None (не важи /
+нема доволно податоци). Декларацијата е dict со полиња по fieldName
+(пр. {"ProcedureCode": "42 00", "TariffCode": "0307998000", "Documents": [...]}).
+
+Употреба: python kb/scripts/validation_engine.py declarations.json|.ndjson [--mrn-registry FILE]
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+RULES_FILE = Path(__file__).parent.parent / "processed" / "lon_validation_rules.json"
+
+# Толеранција при споредба на стапки (TARIC стапките се со 4 децимали)
+RATE_TOLERANCE = 1e-6
+
+# ==============================================================================
+# Токенизација
+# ==============================================================================
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<number>\d+(?:\.\d+)?)
+      | (?P<string>'[^']*')
+      | (?P<param>\{\w+\})
+      | (?P<op><=|>=|<>|!=|=|<|>|\+|-|\*|/|\(|\)|,)
+      | (?P<name>[A-Za-z_][\w.]*)
+    )""", re.VERBOSE)
+
+KEYWORDS = {"AND", "OR", "NOT", "NULL", "IN", "IS", "WHEN", "TRUE", "FALSE", "LENGTH", "SUM"}
+COMPARISONS = {"=", "!=", "<>", "<", "<=", ">", ">="}
+
+
+def tokenize(text):
+    """Листа на (вид, вредност); клучните зборови се враќаат како ("kw", "AND")"""
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Непознат знак во правило на позиција {position}: {text!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "name" and value.upper() in KEYWORDS:
+            kind, value = "kw", value.upper()
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+# ==============================================================================
+# Вредности и споредби
+# ==============================================================================
+
+def field_value(source, path):
+    """Вредност по патека 'A.B' од dict; клучевите се бараат и во camelCase"""
+    value = source
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        if key in value:
+            value = value[key]
+        else:
+            value = value.get(key[:1].lower() + key[1:])
+    return value
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _as_number(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value.replace(",", "."))
+        except ValueError:
+            return None
+    return None
+
+
+def _coerce(left, right):
+    """Доведи две вредности до ист тип (датум, број) за споредба"""
+    if isinstance(left, (date, datetime)) or isinstance(right, (date, datetime)):
+        return _as_date(left), _as_date(right)
+    if isinstance(left, (int, float)) and not isinstance(right, (int, float)):
+        return left, _as_number(right)
+    if isinstance(right, (int, float)) and not isinstance(left, (int, float)):
+        return _as_number(left), right
+    return left, right
+
+
+def _compare(op, left, right):
+    if left is None or right is None:
+        return None
+    left, right = _coerce(left, right)
+    if left is None or right is None:
+        return None
+    try:
+        if op == "=":
+            return left == right
+        if op in ("!=", "<>"):
+            return left != right
+        if op == "<":
+            return left < right
+        if op == "<=":
+            return left <= right
+        if op == ">":
+            return left > right
+        return left >= right
+    except TypeError:
+        return None
+
+
+def _arithmetic(op, left, right):
+    if left is None or right is None:
+        return None
+    if op in "+-" and _as_date(left) is not None and not isinstance(left, (int, float)):
+        days = _as_number(right)
+        if days is None:
+            return None
+        return _as_date(left) + timedelta(days=days if op == "+" else -days)
+    left, right = _as_number(left), _as_number(right)
+    if left is None or right is None:
+        return None
+    if op == "+":
+        return left + right
+    if op == "-":
+        return left - right
+    if op == "*":
+        return left * right
+    return left / right if right else None
+
+
+def _sum(value):
+    """SUM(кол): збир на листа (или на бројките во неа), скалар останува ист"""
+    if value is None:
+        return 0
+    if isinstance(value, (list, tuple)):
+        return sum(_as_number(item) or 0 for item in value)
+    return _as_number(value)
+
+
+def _and(values):
+    result = True
+    for value in values:
+        if value is False:
+            return False
+        if value is None:
+            result = None
+    return result
+
+
+def _or(values):
+    result = False
+    for value in values:
+        if value is True:
+            return True
+        if value is None:
+            result = None
+    return result
+
+# ==============================================================================
+# Парсер: токени → функции env -> вредност
+# ==============================================================================
+
+class Env:
+    """Опсег за евалуација: декларација, вредност на полето, тековен ред од табела"""
+
+    __slots__ = ("declaration", "value", "row")
+
+    def __init__(self, declaration, value=None, row=None):
+        self.declaration = declaration
+        self.value = value
+        self.row = row
+
+    def resolve(self, path):
+        """Идентификатор: од редот (табела/ентитет) ако е поставен, инаку од декларацијата"""
+        if self.row is not None:
+            # Колона што ја нема во редот не се зема од декларацијата
+            return field_value(self.row, path)
+        return field_value(self.declaration, path)
+
+
+class Parser:
+    """Recursive descent парсер за изразите во validationLogic"""
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.position = 0
+        self.names = set()
+        self.params = set()
+
+    # --- помошни ---
+
+    def peek(self, offset=0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def accept(self, kind, value=None):
+        token_kind, token_value = self.peek()
+        if token_kind == kind and (value is None or token_value == value):
+            self.position += 1
+            return token_value
+        return None
+
+    def expect(self, kind, value=None):
+        result = self.accept(kind, value)
+        if result is None:
+            raise ValueError(f"Очекувано {value or kind} на позиција {self.position}: {self.text!r}")
+        return result
+
+    def done(self):
+        return self.position >= len(self.tokens)
+
+    # --- граматика ---
+
+    def parse_condition(self):
+        """or → and → not → споредба"""
+        parts = [self.parse_and()]
+        while self.accept("kw", "OR"):
+            parts.append(self.parse_and())
+        if len(parts) == 1:
+            return parts[0]
+        return lambda env: _or(part(env) for part in parts)
+
+    def parse_and(self):
+        parts = [self.parse_not()]
+        while self.accept("kw", "AND"):
+            parts.append(self.parse_not())
+        if len(parts) == 1:
+            return parts[0]
+        return lambda env: _and(part(env) for part in parts)
+
+    def parse_not(self):
+        if self.peek() == ("kw", "NOT") and self.peek(1) not in (("kw", "NULL"), ("kw", "IN")):
+            self.position += 1
+            inner = self.parse_not()
+
+            def negate(env):
+                value = inner(env)
+                return None if value is None else not value
+            return negate
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        kind, value = self.peek()
+        # Без лев операнд (пр. "IN (...)", "NOT NULL") → вредноста на полето
+        if (kind == "op" and value in COMPARISONS) or (kind == "kw" and value in ("IN", "NOT", "IS")):
+            left = lambda env: env.value
+        else:
+            left = self.parse_additive()
+
+        kind, value = self.peek()
+        if kind == "op" and value in COMPARISONS:
+            self.position += 1
+            right = self.parse_additive()
+            return lambda env: _compare(value, left(env), right(env))
+
+        if self.accept("kw", "IS"):
+            negated = bool(self.accept("kw", "NOT"))
+            self.expect("kw", "NULL")
+            return (lambda env: left(env) is not None) if negated else (lambda env: left(env) is None)
+
+        if self.peek() == ("kw", "NOT") and self.peek(1) == ("kw", "NULL"):
+            self.position += 2
+            return lambda env: left(env) is not None
+
+        negated = False
+        if self.peek() == ("kw", "NOT") and self.peek(1) == ("kw", "IN"):
+            self.position += 1
+            negated = True
+        if self.accept("kw", "IN"):
+            values = self.parse_value_list()
+
+            def member(env):
+                item = left(env)
+                if item is None:
+                    return None
+                return (item not in values) if negated else (item in values)
+            return member
+
+        return left
+
+    def parse_value_list(self):
+        """('a', 'b', 1) → frozenset"""
+        self.expect("op", "(")
+        values = []
+        while True:
+            kind, value = self.peek()
+            self.position += 1
+            if kind == "string":
+                values.append(value[1:-1])
+            elif kind == "number":
+                values.append(float(value))
+            else:
+                raise ValueError(f"Очекувана литерална вредност во листа: {self.text!r}")
+            if not self.accept("op", ","):
+                break
+        self.expect("op", ")")
+        return frozenset(values)
+
+    def parse_additive(self):
+        left = self.parse_term()
+        while self.peek()[0] == "op" and self.peek()[1] in ("+", "-"):
+            op = self.peek()[1]
+            self.position += 1
+            right = self.parse_term()
+            left = (lambda l, r, o: lambda env: _arithmetic(o, l(env), r(env)))(left, right, op)
+        return left
+
+    def parse_term(self):
+        left = self.parse_primary()
+        while self.peek()[0] == "op" and self.peek()[1] in ("*", "/"):
+            op = self.peek()[1]
+            self.position += 1
+            right = self.parse_primary()
+            left = (lambda l, r, o: lambda env: _arithmetic(o, l(env), r(env)))(left, right, op)
+        return left
+
+    def parse_primary(self):
+        kind, value = self.peek()
+        self.position += 1
+
+        if kind == "number":
+            number = float(value) if "." in value else int(value)
+            return lambda env: number
+        if kind == "string":
+            text = value[1:-1]
+            return lambda env: text
+        if kind == "param":
+            name = value[1:-1]
+            if name == "value":
+                return lambda env: env.value
+            self.params.add(name)
+            return lambda env: field_value(env.declaration, name)
+        if kind == "kw" and value in ("TRUE", "FALSE"):
+            constant = value == "TRUE"
+            return lambda env: constant
+        if kind == "kw" and value == "NULL":
+            return lambda env: None
+        if kind == "kw" and value == "LENGTH":
+            if self.accept("op", "("):
+                inner = self.parse_additive()
+                self.expect("op", ")")
+            else:
+                inner = lambda env: env.value
+            return lambda env: None if inner(env) is None else len(str(inner(env)))
+        if kind == "kw" and value == "SUM":
+            self.expect("op", "(")
+            inner = self.parse_additive()
+            self.expect("op", ")")
+            return lambda env: _sum(inner(env))
+        if kind == "op" and value == "(":
+            inner = self.parse_additive()
+            self.expect("op", ")")
+            return inner
+        if kind == "op" and value == "-":
+            inner = self.parse_primary()
+            return lambda env: _arithmetic("-", 0, inner(env))
+        if kind == "name":
+            self.names.add(value)
+            return lambda env: env.resolve(value)
+
+        raise ValueError(f"Неочекуван токен {value!r} во правило: {self.text!r}")
+
+
+def parse_expression(text):
+    """
+    Компајлирај услов/израз; враќа (функција, идентификатори, {параметри}).
+    Идентификаторите се читаат од редот (ако е поставен) или од декларацијата,
+    параметрите секогаш од декларацијата.
+    """
+    parser = Parser(text)
+    function = parser.parse_condition()
+    if not parser.done():
+        raise ValueError(f"Вишок текст по позиција {parser.position}: {text!r}")
+    return function, parser.names, parser.params
+
+
+def split_conjuncts(text):
+    """'A = 1 AND B IN (...)' → ['A = 1', 'B IN (...)'] (AND надвор од загради и стрингови)"""
+    parts = re.split(r"\s+AND\s+(?=(?:[^']*'[^']*')*[^']*$)(?![^()]*\))", text, flags=re.IGNORECASE)
+    return [part.strip() for part in parts if part.strip()]
+
+
+_KEY_CONDITION = re.compile(r"^(\w+)\s*=\s*(\{\w+\})$")
+
+
+def split_key(where):
+    """
+    WHERE на табела: 'TariffNumber = {value} AND IsActive = TRUE' →
+    (израз за клучот, [услови врз редот], {параметри од декларацијата})
+    """
+    key = None
+    conditions = []
+    params = set()
+    for conjunct in split_conjuncts(where):
+        match = _KEY_CONDITION.match(conjunct)
+        if key is None and match:
+            key, _, used = parse_expression(match.group(2))
+        else:
+            condition, _, used = parse_expression(conjunct)
+            conditions.append(condition)
+        params |= used
+    if key is None:
+        raise ValueError(f"WHERE нема услов за клуч (Кол = {{Поле}}): {where!r}")
+    return key, conditions, params
+
+# ==============================================================================
+# Компајлирање на правила
+# ==============================================================================
+
+class ValidationContext:
+    """
+    Надворешни табели за CrossTable правила: {име: извор}.
+    Извор е dict клуч → ред или објект со lookup(клуч) (пр. TariffTable).
+    """
+
+    def __init__(self, tables=None):
+        self.tables = dict(tables or {})
+
+    def has(self, table):
+        return table in self.tables
+
+    def row(self, table, key):
+        source = self.tables[table]
+        if hasattr(source, "lookup"):
+            return source.lookup(key)
+        return source.get(key)
+
+    def consume(self, table, key, column, amount):
+        """Потрошувачка на количина (SUM(Кол) + {Поле}); се следи само во BatchContext"""
+
+
+class BatchContext(ValidationContext):
+    """
+    Контекст за серија декларации: сите различни клучеви (тарифни ознаки,
+    MRN) се собираат однапред и се разрешуваат во едно поминување по табела,
+    а потрошените количини се собираат тековно по клуч, па секоја следна
+    декларација во серијата ја гледа потрошувачката на претходните.
+    Потрошувачката на декларацијата што се валидира е привремена додека
+    validate_batch не ја потврди (commit) или отфрли (discard).
+    """
+
+    def __init__(self, tables=None):
+        super().__init__(tables)
+        self._rows = {}
+        self._consumed = {}
+        self._pending = {}
+        self.stats = {}
+
+    def prefetch(self, declarations, rules):
+        """Разреши ги сите клучеви што CrossTable правилата ќе ги бараат"""
+        keys = {}
+        for rule in rules:
+            if rule.lookup is None or not self.has(rule.lookup[0]):
+                continue
+            table, key = rule.lookup
+            wanted = keys.setdefault(table, set())
+            for declaration in declarations:
+                if rule.applies(declaration):
+                    value = field_value(declaration, rule.field) if rule.field else None
+                    key_value = key(Env(declaration, value))
+                    if key_value is not None:
+                        wanted.add(key_value)
+
+        for table, wanted in keys.items():
+            cache = self._rows.setdefault(table, {})
+            wanted -= cache.keys()
+            source = self.tables[table]
+            if hasattr(source, "lookup_many"):
+                found = source.lookup_many(wanted)
+                cache.update((key, found.get(str(key))) for key in wanted)
+            else:
+                cache.update((key, ValidationContext.row(self, table, key)) for key in wanted)
+            self.stats[table] = len(cache)
+
+    def row(self, table, key):
+        cache = self._rows.setdefault(table, {})
+        if key not in cache:
+            cache[key] = super().row(table, key)
+        row = cache[key]
+        consumed = [amounts.get((table, key)) for amounts in (self._consumed, self._pending)]
+        if row is None or not any(consumed):
+            return row
+        row = dict(row)
+        for columns in filter(None, consumed):
+            for column, amount in columns.items():
+                row[column] = (_sum(field_value(row, column)) or 0) + amount
+        return row
+
+    def consume(self, table, key, column, amount):
+        pending = self._pending.setdefault((table, key), {})
+        pending[column] = pending.get(column, 0) + amount
+
+    def commit(self):
+        """Потврди ја потрошувачката на тековната декларација"""
+        for table_key, columns in self._pending.items():
+            consumed = self._consumed.setdefault(table_key, {})
+            for column, amount in columns.items():
+                consumed[column] = consumed.get(column, 0) + amount
+        self._pending.clear()
+
+    def discard(self):
+        """Отфрли ја потрошувачката на тековната декларација (декларацијата е одбиена)"""
+        self._pending.clear()
+
+    def consumed(self, table):
+        """Тековни збирови на потрошена количина {клуч: {колона: количина}} за табела"""
+        return {key: dict(columns) for (name, key), columns in self._consumed.items() if name == table}
+
+
+_REGEX = re.compile(r"^REGEX:\s*(?P<pattern>.+)$", re.DOTALL)
+_EXISTS_IN = re.compile(r"^EXISTS\s+IN\s+(?P<table>\w+)\s+WHERE\s+(?P<where>.+)$", re.IGNORECASE | re.DOTALL)
+_MATCH = re.compile(r"^MATCH\s+(?P<table>\w+)\.(?P<column>\w+)\s+WHERE\s+(?P<where>.+)$", re.IGNORECASE | re.DOTALL)
+_EXISTS = re.compile(r"^EXISTS\s+(?P<entity>\w+)\s+WHERE\s+(?P<where>.+)$", re.IGNORECASE | re.DOTALL)
+_FROM = re.compile(r"^(?P<expression>.+?)\s+FROM\s+(?P<table>\w+)\s+WHERE\s+(?P<where>.+)$", re.IGNORECASE | re.DOTALL)
+# SUM(UsedQuantity) + {Quantity} <= ... : {Quantity} се додава на UsedQuantity кога правилото е исполнето
+_CONSUMES = re.compile(r"^\s*SUM\((?P<column>\w+)\)\s*\+\s*\{(?P<param>\w+)\}", re.IGNORECASE)
+_WHEN = re.compile(r"^(?P<logic>.+?)\s+WHEN\s+(?P<condition>.+)$", re.IGNORECASE | re.DOTALL)
+
+
+def _compile_regex(match, rule):
+    pattern = re.compile(match.group("pattern").strip())
+
+    def check(declaration, value, context):
+        if value is None:
+            return None
+        return pattern.search(str(value)) is not None
+    return check, None, set()
+
+
+def _compile_exists_in(match, rule):
+    table = match.group("table")
+    key, conditions, reads = split_key(match.group("where"))
+
+    def check(declaration, value, context):
+        if context is None or not context.has(table):
+            return None
+        env = Env(declaration, value)
+        key_value = key(env)
+        if key_value is None:
+            return None
+        row = context.row(table, key_value)
+        if row is None:
+            return False
+        env.row = row
+        return _and(condition(env) for condition in conditions) is not False
+    return check, (table, key), reads
+
+
+def _compile_match(match, rule):
+    table, column = match.group("table"), match.group("column")
+    key, conditions, reads = split_key(match.group("where"))
+
+    def check(declaration, value, context):
+        if context is None or not context.has(table) or value is None:
+            return None
+        env = Env(declaration, value)
+        key_value = key(env)
+        row = context.row(table, key_value) if key_value is not None else None
+        if row is None:
+            # Непостоечка ознака ја пријавува EXISTS правилото
+            return None
+        env.row = row
+        if _and(condition(env) for condition in conditions) is False:
+            return None
+        expected = field_value(row, column)
+        if expected is None:
+            return None
+        actual = _as_number(value)
+        if actual is None:
+            return False
+        return abs(actual - _as_number(expected)) <= RATE_TOLERANCE
+    return check, (table, key), reads
+
+
+def _compile_exists(match, rule):
+    entity = match.group("entity")
+    collection = rule.get("fieldName") or entity + "s"
+    item_conditions = []
+    declaration_conditions = []
+    reads = {collection}
+    for conjunct in split_conjuncts(match.group("where")):
+        function, names, params = parse_expression(conjunct)
+        reads |= params
+        # Колоните на ентитетот го носат неговото име (Document → DocumentType)
+        if names and all(name.startswith(entity) for name in names):
+            item_conditions.append(function)
+        else:
+            declaration_conditions.append(function)
+            reads |= names
+
+    def check(declaration, value, context):
+        env = Env(declaration, value)
+        if _and(condition(env) for condition in declaration_conditions) is not True:
+            return None
+        for item in field_value(declaration, collection) or ():
+            env.row = item
+            if all(condition(env) is True for condition in item_conditions):
+                return True
+        return False
+    return check, None, reads
+
+
+def _compile_from(match, rule):
+    table = match.group("table")
+    expression, _, params = parse_expression(match.group("expression"))
+    key, conditions, reads = split_key(match.group("where"))
+    reads |= params
+    consumes = _CONSUMES.match(match.group("expression"))
+
+    def check(declaration, value, context):
+        if context is None or not context.has(table):
+            return None
+        env = Env(declaration, value)
+        key_value = key(env)
+        row = context.row(table, key_value) if key_value is not None else None
+        if row is None:
+            return None
+        env.row = row
+        if _and(condition(env) for condition in conditions) is False:
+            return None
+        result = expression(env)
+        if result is True and consumes:
+            amount = _as_number(field_value(declaration, consumes.group("param")))
+            if amount:
+                context.consume(table, key_value, consumes.group("column"), amount)
+        return result
+    return check, (table, key), reads
+
+
+def _compile_condition(text, rule):
+    when = _WHEN.match(text)
+    logic, names, params = parse_expression(when.group("logic") if when else text)
+    reads = names | params
+    guard = None
+    if when:
+        guard, names, params = parse_expression(when.group("condition"))
+        reads |= names | params
+
+    def check(declaration, value, context):
+        env = Env(declaration, value)
+        if guard is not None and guard(env) is not True:
+            return None
+        return logic(env)
+    return check, None, reads
+
+
+FORMS = (
+    (_REGEX, _compile_regex),
+    (_EXISTS_IN, _compile_exists_in),
+    (_MATCH, _compile_match),
+    (_EXISTS, _compile_exists),
+    (_FROM, _compile_from),
+)
+
+
+class CompiledRule:
+    """Правило со компајлиран предикат check(декларација, контекст) → True/False/None"""
+
+    __slots__ = ("rule", "code", "field", "severity", "priority", "procedures",
+                 "lookup", "reads", "_check")
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.code = rule["ruleCode"]
+        self.field = rule.get("fieldName")
+        self.severity = rule.get("severity", "Error")
+        self.priority = rule.get("priority", 0)
+        procedure = rule.get("procedureCode")
+        self.procedures = frozenset(procedure.split("|")) if procedure else None
+
+        logic = rule.get("validationLogic", "").strip()
+        for pattern, compiler in FORMS:
+            match = pattern.match(logic)
+            if match:
+                self._check, self.lookup, reads = compiler(match, rule)
+                break
+        else:
+            self._check, self.lookup, reads = _compile_condition(logic, rule)
+
+        # Полиња од декларацијата што правилото ги чита (LONAuthorization.X → LONAuthorization)
+        reads = {name.split(".")[0] for name in reads}
+        if self.field:
+            reads.add(self.field)
+        if self.procedures is not None:
+            reads.add("ProcedureCode")
+        self.reads = frozenset(reads)
+
+    @property
+    def cross_table(self):
+        """Дали правилото бара надворешна табела (TARIC, MRN регистар)"""
+        return self.lookup is not None
+
+    def applies(self, declaration):
+        """Дали правилото важи за процедурата на декларацијата"""
+        return self.procedures is None or declaration.get("ProcedureCode") in self.procedures
+
+    def check(self, declaration, context=None):
+        if not self.applies(declaration):
+            return None
+        value = field_value(declaration, self.field) if self.field else None
+        result = self._check(declaration, value, context)
+        return None if result is None else bool(result)
+
+    def violation(self):
+        return {
+            "ruleCode": self.code,
+            "fieldName": self.field,
+            "severity": self.severity,
+            "messageMK": self.rule.get("errorMessageMK"),
+            "messageEN": self.rule.get("errorMessageEN")
+        }
+
+
+def compile_rules(rules):
+    """Компајлирај ги правилата (по priority)"""
+    return [CompiledRule(rule) for rule in sorted(rules, key=lambda rule: rule.get("priority", 0))]
+
+
+def load_rules(path=RULES_FILE):
+    """Вчитај и компајлирај lon_validation_rules.json"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return compile_rules(json.load(f))
+
+class RuleIndex:
+    """
+    Индекс на применливост: процедура → подредени правила (вклучувајќи ги
+    општите), поле → правила што го читаат, и кои правила бараат табела.
+    Валидаторот така ги извршува само правилата за процедурата.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.general = [rule for rule in self.rules if rule.procedures is None]
+        procedures = sorted({code for rule in self.rules if rule.procedures for code in rule.procedures})
+        self.by_procedure = {
+            code: [rule for rule in self.rules if rule.procedures is None or code in rule.procedures]
+            for code in procedures
+        }
+        self.by_field = {}
+        for rule in self.rules:
+            for field in sorted(rule.reads):
+                self.by_field.setdefault(field, []).append(rule)
+
+    def for_declaration(self, declaration):
+        """Правила што важат за процедурата на декларацијата"""
+        return self.by_procedure.get(declaration.get("ProcedureCode"), self.general)
+
+    def for_fields(self, fields):
+        """Правила што читаат некое од полињата (по priority, без дупликати)"""
+        selected = {id(rule) for field in fields for rule in self.by_field.get(field, ())}
+        return [rule for rule in self.rules if id(rule) in selected]
+
+    def to_json(self):
+        return {
+            "general": [rule.code for rule in self.general],
+            "byProcedure": {code: [rule.code for rule in rules] for code, rules in self.by_procedure.items()},
+            "byField": {field: [rule.code for rule in rules] for field, rules in sorted(self.by_field.items())},
+            "rules": {
+                rule.code: {
+                    "priority": rule.priority,
+                    "ruleType": rule.rule.get("ruleType"),
+                    "procedures": sorted(rule.procedures) if rule.procedures else None,
+                    "reads": sorted(rule.reads),
+                    "crossTable": rule.cross_table,
+                    "table": rule.lookup[0] if rule.lookup else None
+                }
+                for rule in self.rules
+            }
+        }
+
+# ==============================================================================
+# Валидација
+# ==============================================================================
+
+def validate(declaration, rules, context=None):
+    """Листа на прекршувања за една декларација"""
+    return [rule.violation() for rule in rules if rule.check(declaration, context) is False]
+
+
+def validate_batch(declarations, rules, context=None):
+    """
+    Прекршувања за секоја декларација, по редослед на влезот.
+    Табелите се разрешуваат еднаш за целата серија (BatchContext), а
+    количините по MRN се следат тековно низ серијата: се сметаат само
+    декларациите без прекршувања со severity Error.
+    """
+    index = rules if isinstance(rules, RuleIndex) else RuleIndex(rules)
+    if context is not None and not isinstance(context, BatchContext):
+        context = BatchContext(context.tables)
+    declarations = list(declarations)
+    if context is None:
+        return [validate(declaration, index.for_declaration(declaration)) for declaration in declarations]
+
+    context.prefetch(declarations, index.rules)
+    results = []
+    for declaration in declarations:
+        violations = validate(declaration, index.for_declaration(declaration), context)
+        if any(violation["severity"] == "Error" for violation in violations):
+            context.discard()
+        else:
+            context.commit()
+        results.append(violations)
+    return results
+
+
+def load_declarations(path):
+    """Декларации од JSON листа или NDJSON (.ndjson)"""
+    path = Path(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.suffix == ".ndjson":
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+def load_context(mrn_registry=None, tariff_table=None):
+    """TariffCodes од бинарната TARIC табела и MRNRegistry од JSON (ако постојат)"""
+    tables = {}
+    if tariff_table is not None and Path(tariff_table).exists():
+        from tariff_table import TariffTable
+        tables["TariffCodes"] = TariffTable(tariff_table)
+    if mrn_registry is not None:
+        with open(mrn_registry, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        if isinstance(entries, list):
+            # Записите без MRN не можат да се најдат по клуч
+            entries = {entry["MRN"]: entry for entry in entries
+                       if isinstance(entry, dict) and entry.get("MRN")}
+        tables["MRNRegistry"] = entries
+    return ValidationContext(tables)
+
+
+def main():
+    from tariff_table import TABLE_FILE
+
+    parser = argparse.ArgumentParser(description="Валидација на LON декларации офлајн")
+    parser.add_argument("declarations", type=Path, help="JSON листа или NDJSON со декларации")
+    parser.add_argument("--rules", type=Path, default=RULES_FILE, help="lon_validation_rules.json")
+    parser.add_argument("--mrn-registry", type=Path, default=None,
+                        help="JSON снимка на MRN регистарот (листа или {MRN: запис})")
+    parser.add_argument("--tariff-table", type=Path, default=TABLE_FILE,
+                        help="бинарна TARIC табела (import_taric.py)")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("🔎 ВАЛИДАЦИЈА НА LON ДЕКЛАРАЦИИ")
+    print("=" * 80)
+
+    rules = load_rules(args.rules)
+    declarations = load_declarations(args.declarations)
+    context = BatchContext(load_context(args.mrn_registry, args.tariff_table).tables)
+    print(f"📋 Правила: {len(rules)}, декларации: {len(declarations)}, "
+          f"табели: {', '.join(context.tables) or 'нема'}")
+
+    started = time.perf_counter()
+    results = validate_batch(declarations, rules, context)
+    elapsed = time.perf_counter() - started
+
+    by_rule = {}
+    for violations in results:
+        for violation in violations:
+            key = (violation["severity"], violation["ruleCode"])
+            by_rule[key] = by_rule.get(key, 0) + 1
+
+    invalid = sum(1 for violations in results if any(v["severity"] == "Error" for v in violations))
+    rate = len(declarations) / elapsed if elapsed else 0
+    print(f"\n✅ Валидни: {len(declarations) - invalid}, ❌ со грешки: {invalid}")
+    print(f"⏱️  {elapsed:.2f} с ({rate:,.0f} декларации/с)")
+    for table, count in context.stats.items():
+        print(f"🔗 {table}: {count} различни клучеви разрешени во едно поминување")
+
+    if by_rule:
+        print(f"\n📊 Прекршувања по правило:")
+        for (severity, code), count in sorted(by_rule.items()):
+            print(f"  {severity} {code}: {count}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except FileNotFoundError as e:
+        print(f"❌ Грешка: Фајлот не постои: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Грешка: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Квантизирана векторска база (kb_vectors.bin) за brute-force пребарување
+Векторите од embed_kb.py се L2 нормализираат и се запишуваат континуирано
+како int8 (со float32 скала по ред) или float16, за mmap без парсирање.
+Пребарувањето е едно матрица × вектор множење по блокови (или матрица ×
+матрица за повеќе прашања одеднаш) и top-k со argpartition. Со in_memory=True
+базата еднаш се претвора во float32 во меморија (4x поголема од фајлот), па
+float16 базата не се конвертира при секое прашање.
+
+Формат (little-endian, секциите порамнети на 64 бајти):
+    header   - magic "LONVECS1", верзија, редови, димензии, тип (1 = float16, 2 = int8)
+    vectors  - int8/float16[редови][димензии]
+    scales   - float32[редови] (само int8: вектор ≈ int8 * скала)
+
+Ред → id на chunk и моделот се во kb_vectors.json.
+Извор: kb/processed/kb_embeddings.f32 + kb_embeddings.json (embed_kb.py)
+Output: kb/processed/kb_vectors.bin, kb/processed/kb_vectors.json
+Употреба: python kb/scripts/vector_store.py [--dtype int8|float16]
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"LONVECS1"
+VERSION = 1
+HEADER = struct.Struct("<8sIIII")
+ALIGNMENT = 64
+
+# Име → (код во header-от, NumPy тип)
+DTYPES = {
+    "float16": (1, np.float16),
+    "int8": (2, np.int8),
+}
+
+# Редови што се конвертираат во float32 одеднаш при пребарување
+# (блокот останува во кешот на процесорот: 1024 × 256 × 4 бајти = 1 MB)
+SEARCH_BLOCK = 1024
+
+PROCESSED_DIR = Path(__file__).parent.parent / "processed"
+VECTORS_FILE = PROCESSED_DIR / "kb_vectors.bin"
+VECTORS_MAP_FILE = PROCESSED_DIR / "kb_vectors.json"
+
+
+def _aligned(position):
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize(matrix, dtype="int8"):
+    """Нормализирани вектори → (квантизирана матрица, скали или None)"""
+    matrix = _normalize(matrix)
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    scales = np.abs(matrix).max(axis=1) / 127
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def write_vector_store(matrix, ids, dtype="int8", model=None,
+                       output_file=VECTORS_FILE, map_file=VECTORS_MAP_FILE):
+    """Запиши квантизирана векторска база; враќа големина на фајлот во бајти"""
+    if dtype not in DTYPES:
+        raise ValueError(f"Непознат тип: {dtype} ({', '.join(DTYPES)})")
+    if sys.byteorder != "little":
+        raise ValueError("Векторската база е поддржана само на little-endian платформи")
+    rows, dimensions = matrix.shape
+    if len(ids) != rows:
+        raise ValueError(f"Бројот на id ({len(ids)}) не одговара на редовите ({rows})")
+
+    vectors, scales = quantize(matrix, dtype)
+    output_file = Path(output_file)
+    output_file.parent.mkdir(exist_ok=True)
+
+    tmp_file = output_file.with_name(output_file.name + ".tmp")
+    with open(tmp_file, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, rows, dimensions, DTYPES[dtype][0]))
+        for section in (vectors, scales):
+            if section is None:
+                continue
+            f.write(b"\0" * (_aligned(f.tell()) - f.tell()))
+            f.write(np.ascontiguousarray(section).tobytes())
+        size = f.tell()
+    os.replace(tmp_file, output_file)
+
+    map_file = Path(map_file)
+    tmp_file = map_file.with_name(map_file.name + ".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({"model": model, "dtype": dtype, "rows": rows, "dimensions": dimensions,
+                   "ids": list(ids)}, f, ensure_ascii=False)
+    os.replace(tmp_file, map_file)
+    return size
+
+
+def top_k(scores, k):
+    """Индекси на k најголеми вредности (по последната оска), подредени опаѓачки"""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.zeros(scores.shape[:-1] + (0,), dtype=np.int64)
+    best = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, best, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(best, order, axis=-1)
+
+
+class VectorStore:
+    """
+    Читач на kb_vectors.bin преку mmap; векторите не се вчитуваат однапред,
+    освен со in_memory=True (float32 копија, без конверзија по прашање).
+    """
+
+    def __init__(self, path=VECTORS_FILE, map_file=VECTORS_MAP_FILE, in_memory=False):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, rows, dimensions, code = HEADER.unpack_from(self._mmap)
+        names = {code: name for name, (code, _) in DTYPES.items()}
+        if magic != MAGIC or version != VERSION or code not in names:
+            raise ValueError(f"Непознат формат на векторска база: {path}")
+        if sys.byteorder != "little":
+            raise ValueError("Векторската база е поддржана само на little-endian платформи")
+
+        self.dtype = names[code]
+        self.rows = rows
+        self.dimensions = dimensions
+        position = _aligned(HEADER.size)
+        self.vectors = np.frombuffer(self._mmap, dtype=DTYPES[self.dtype][1],
+                                     count=rows * dimensions, offset=position).reshape(rows, dimensions)
+        position = _aligned(position + self.vectors.nbytes)
+        self.scales = None
+        if self.dtype == "int8":
+            self.scales = np.frombuffer(self._mmap, dtype=np.float32, count=rows, offset=position)
+
+        self._float32 = None
+        if in_memory:
+            self._float32 = self.vectors.astype(np.float32)
+            if self.scales is not None:
+                self._float32 *= self.scales[:, None]
+
+        with open(map_file, 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+        self.ids = mapping["ids"]
+        self.model = mapping.get("model")
+
+    def __len__(self):
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Затвори ја базата. Враќа True ако mmap е ослободен, или False ако низи
+        земени од store.vectors / store.scales уште се користат: тие остануваат
+        валидни, а mmap се ослободува заедно со последната од нив.
+        """
+        self.vectors = self.scales = self._float32 = None
+        try:
+            self._mmap.close()
+            released = True
+        except BufferError:
+            released = False
+        # mmap има свој дупликат од дескрипторот, па фајлот може да се затвори и без него
+        self._file.close()
+        return released
+
+    def scores(self, queries):
+        """Косинусна сличност: (прашања × димензии) → (прашања × редови)"""
+        queries = _normalize(np.atleast_2d(queries)).T
+        if self._float32 is not None:
+            return (self._float32 @ queries).T
+        out = np.empty((self.rows, queries.shape[1]), dtype=np.float32)
+        buffer = np.empty((min(SEARCH_BLOCK, self.rows), self.dimensions), dtype=np.float32)
+        for start in range(0, self.rows, SEARCH_BLOCK):
+            block = self.vectors[start:start + SEARCH_BLOCK]
+            converted = buffer[:len(block)]
+            converted[...] = block
+            np.matmul(converted, queries, out=out[start:start + len(block)])
+        if self.scales is not None:
+            out *= self.scales[:, None]
+        return out.T
+
+    def search_batch(self, queries, k=10):
+        """За секое прашање: [(score, ред, id на chunk)] подредени опаѓачки"""
+        scores = self.scores(queries)
+        best = top_k(scores, k)
+        return [
+            [(float(row_scores[row]), int(row), self.ids[row]) for row in rows]
+            for row_scores, rows in zip(scores, best)
+        ]
+
+    def search(self, query, k=10):
+        """Top-k за едно прашање (еден вектор)"""
+        return self.search_batch(np.asarray(query, dtype=np.float32)[None, :], k)[0]
+
+
+def main():
+    from embed_kb import load_embeddings
+
+    parser = argparse.ArgumentParser(description="Квантизирана mmap векторска база од kb_embeddings")
+    parser.add_argument("--dtype", choices=sorted(DTYPES), default="int8", help="тип на векторите")
+    parser.add_argument("--check", type=int, default=100,
+                        help="прашања (примероци од самата база) за проверка на recall@10 и брзина")
+    parser.add_argument("--in-memory", action="store_true",
+                        help="проверка со float32 копија во меморија наместо конверзија по прашање")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("🗜️  КВАНТИЗИРАНА ВЕКТОРСКА БАЗА")
+    print("=" * 80)
+
+    matrix, mapping = load_embeddings()
+    size = write_vector_store(matrix, mapping["ids"], args.dtype, mapping.get("model"))
+    print(f"📋 Вектори: {matrix.shape[0]} × {matrix.shape[1]} ({mapping.get('model')})")
+    print(f"📦 {VECTORS_FILE}: {size / 1024 / 1024:.2f} MB "
+          f"(float32: {matrix.nbytes / 1024 / 1024:.2f} MB, {matrix.nbytes / max(size, 1):.1f}x помалку)")
+
+    if args.check and len(matrix):
+        rng = np.random.default_rng(0)
+        sample = rng.choice(len(matrix), size=min(args.check, len(matrix)), replace=False)
+        queries = np.asarray(matrix[sample], dtype=np.float32)
+        exact = top_k(_normalize(queries) @ _normalize(matrix).T, 10)
+
+        with VectorStore(in_memory=args.in_memory) as store:
+            started = time.perf_counter()
+            for query in queries:
+                store.search(query, 10)
+            single = (time.perf_counter() - started) / len(queries) * 1000
+            started = time.perf_counter()
+            results = store.search_batch(queries, 10)
+            batch = (time.perf_counter() - started) / len(queries) * 1000
+
+        recall = np.mean([len({row for _, row, _ in hits} & set(expected.tolist())) / len(expected)
+                          for hits, expected in zip(results, exact)])
+        print(f"🎯 recall@10 наспроти float32: {recall:.3f}")
+        print(f"⏱️  Пребарување: {single:.2f} ms по прашање, {batch:.2f} ms по прашање во пакет")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except FileNotFoundError as e:
+        print(f"❌ Грешка: Фајлот не постои: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Грешка: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -2,10 +2,38 @@
 # -*- coding: utf-8 -*-
 """
 Script to translate city names to Macedonian
+
+Usage: python translate_cities.py [--input FILE] [--output FILE] [--delimiter ;]
+The CSV is streamed in chunks and replaced atomically (safe for in-place runs).
 """
 
+import argparse
 import csv
+import hashlib
+import json
+import os
 import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+
+# Rows translated and written per chunk in translate_csv
+CHUNK_SIZE = 10000
+
+# Max names remembered by translate_city (LRU)
+TRANSLATE_CACHE_SIZE = 65536
+# Distinct names a chunk needs before the process pool is started
+POOL_THRESHOLD = 5000
+
+# Persistent translation store (seeded from CITY_TRANSLATIONS)
+STORE_FILE = Path(__file__).parent / 'city_translations.db'
+# Max names per SQLite "IN (...)" query
+STORE_BATCH = 500
 
 # Dictionary for city name translations - how they're actually pronounced in Macedonian
 CITY_TRANSLATIONS = {
@@ -93,139 +121,184 @@ CITY_TRANSLATIONS = {
     "Torre Maggiore": "Торе Маџоре",
 }
 
+# Multi-character combinations (order matters - applied as sequential passes)
+REPLACEMENTS = [
+    # English phonetics
+    (r'tion\b', 'шн'),
+    (r'tion', 'шон'),
+    (r'sion\b', 'жн'),
+    (r'sion', 'жон'),
+    ('ough', 'аф'),
+    ('augh', 'оф'),
+    ('eigh', 'еј'),
+
+    # Consonant clusters
+    ('tch', 'ч'),
+    ('ch', 'ч'),
+    ('sh', 'ш'),
+    ('zh', 'ж'),
+    ('th', 'т'),  # English th -> t
+    ('ph', 'ф'),
+    ('gh', 'г'),
+    ('ck', 'к'),
+    ('qu', 'кв'),
+    ('x', 'кс'),
+
+    # Special combinations
+    ('sch', 'ш'),
+    ('cz', 'ч'),
+    ('sz', 'с'),
+    ('dj', 'џ'),
+    ('dz', 'џ'),
+    ('gj', 'џ'),
+    ('kj', 'ќ'),
+    ('lj', 'љ'),
+    ('nj', 'њ'),
+
+    # Double consonants
+    ('bb', 'б'),
+    ('cc', 'к'),
+    ('dd', 'д'),
+    ('ff', 'ф'),
+    ('gg', 'г'),
+    ('ll', 'л'),
+    ('mm', 'м'),
+    ('nn', 'н'),
+    ('pp', 'п'),
+    ('rr', 'р'),
+    ('ss', 'с'),
+    ('tt', 'т'),
+    ('zz', 'з'),
+]
+
+# Single character mapping
+CHAR_MAPPING = {
+    'a': 'а', 'A': 'А',
+    'b': 'б', 'B': 'Б',
+    'c': 'к', 'C': 'К',  # c -> k sound
+    'd': 'д', 'D': 'Д',
+    'e': 'е', 'E': 'Е',
+    'f': 'ф', 'F': 'Ф',
+    'g': 'г', 'G': 'Г',
+    'h': 'х', 'H': 'Х',
+    'i': 'и', 'I': 'И',
+    'j': 'џ', 'J': 'Џ',  # English j -> dzh sound
+    'k': 'к', 'K': 'К',
+    'l': 'л', 'L': 'Л',
+    'm': 'м', 'M': 'М',
+    'n': 'н', 'N': 'Н',
+    'o': 'о', 'O': 'О',
+    'p': 'п', 'P': 'П',
+    'q': 'к', 'Q': 'К',
+    'r': 'р', 'R': 'Р',
+    's': 'с', 'S': 'С',
+    't': 'т', 'T': 'Т',
+    'u': 'у', 'U': 'У',
+    'v': 'в', 'V': 'В',
+    'w': 'в', 'W': 'В',  # w -> v sound
+    'y': 'ј', 'Y': 'Ј',  # y at start/middle -> j sound
+    'z': 'з', 'Z': 'З',
+}
+
+class Transliterator:
+    """
+    Compiled replacement engine, built once from REPLACEMENTS.
+
+    One regex finds, in a single scan, every position where some pattern
+    starts: patterns are grouped by their first letter and each one is an
+    optional group inside a lookahead, so overlapping occurrences are seen.
+    The matches are then resolved in priority order exactly like the
+    sequential re.sub passes: a pattern only takes occurrences that don't
+    overlap an earlier pattern's replacement or its own previous match.
+    Replacements are Cyrillic, so they never create new Latin matches.
+    """
+
+    def __init__(self, replacements):
+        by_letter = {}
+        for priority, (old, new) in enumerate(replacements):
+            source = old if old.startswith('\\') or old.endswith('\\') else re.escape(old)
+            by_letter.setdefault(old[0].lower(), []).append((priority, source))
+
+        # Group number in the compiled regex -> priority in REPLACEMENTS
+        self.priorities = []
+        branches = []
+        for letter, sources in by_letter.items():
+            self.priorities.extend(priority for priority, _ in sources)
+            branches.append(f'(?={re.escape(letter)})' + ''.join(f'({source})?' for _, source in sources))
+
+        self.replacements = [new for _, new in replacements]
+        self.pattern = re.compile(
+            '(?=' + '|'.join(source for sources in by_letter.values() for _, source in sources) + ')'
+            '(?=' + '|'.join(branches) + ')',
+            flags=re.IGNORECASE
+        )
+
+    def replace(self, text):
+        candidates = []
+        for match in self.pattern.finditer(text):
+            start = match.start()
+            for priority, found in zip(self.priorities, match.groups()):
+                if found:
+                    candidates.append((priority, start, start + len(found)))
+
+        if not candidates:
+            return text
+
+        candidates.sort()
+        claimed = []
+        last_priority, last_end = None, 0
+        for priority, start, end in candidates:
+            if priority != last_priority:
+                last_priority, last_end = priority, 0
+            if start < last_end or any(start < e and s < end for s, e, _ in claimed):
+                continue
+            claimed.append((start, end, self.replacements[priority]))
+            last_end = end
+
+        claimed.sort()
+        parts = []
+        position = 0
+        for start, end, new in claimed:
+            parts.append(text[position:start])
+            parts.append(new)
+            position = end
+        parts.append(text[position:])
+        return ''.join(parts)
+
+TRANSLITERATOR = Transliterator(REPLACEMENTS)
+CHAR_TABLE = str.maketrans(CHAR_MAPPING)
+
+def table_version(*tables):
+    """Short SHA-1 of the given tables, so the store notices any edit to them"""
+    return hashlib.sha1(json.dumps(tables, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+# Stored transcriptions are recomputed when the transliteration tables change
+TRANSCRIPTION_VERSION = table_version(REPLACEMENTS, sorted(CHAR_MAPPING.items()))
+# The store is reseeded when CITY_TRANSLATIONS changes
+SEED_VERSION = table_version(sorted(CITY_TRANSLATIONS.items()))
+
+def capitalize_word(word):
+    """Capitalize the first letter (e.g. 'o-Mar -> 'O-мар), lowercase the rest"""
+    for i, c in enumerate(word):
+        if c.isalpha():
+            break
+    else:
+        i = 0
+    return word[:i] + word[i].upper() + word[i+1:].lower()
+
 def phonetic_transcribe(text):
     """
     Phonetic transcription to Macedonian Cyrillic (how it's pronounced)
     """
     if not text:
         return text
-        
-    result = text
-    
-    # Multi-character combinations first (order matters!)
-    replacements = [
-        # English phonetics
-        (r'tion\b', 'шн'),
-        (r'tion', 'шон'),
-        (r'sion\b', 'жн'),
-        (r'sion', 'жон'),
-        ('ough', 'аф'),
-        ('augh', 'оф'),
-        ('eigh', 'еј'),
-        
-        # Consonant clusters
-        ('tch', 'ч'),
-        ('ch', 'ч'),
-        ('sh', 'ш'),
-        ('zh', 'ж'),
-        ('th', 'т'),  # English th -> t
-        ('ph', 'ф'),
-        ('gh', 'г'),
-        ('ck', 'к'),
-        ('qu', 'кв'),
-        ('x', 'кс'),
-        
-        # Special combinations
-        ('sch', 'ш'),
-        ('cz', 'ч'),
-        ('sz', 'с'),
-        ('dj', 'џ'),
-        ('dz', 'џ'),
-        ('gj', 'џ'),
-        ('kj', 'ќ'),
-        ('lj', 'љ'),
-        ('nj', 'њ'),
-        
-        # Double consonants
-        ('bb', 'б'),
-        ('cc', 'к'),
-        ('dd', 'д'),
-        ('ff', 'ф'),
-        ('gg', 'г'),
-        ('ll', 'л'),
-        ('mm', 'м'),
-        ('nn', 'н'),
-        ('pp', 'п'),
-        ('rr', 'р'),
-        ('ss', 'с'),
-        ('tt', 'т'),
-        ('zz', 'з'),
-    ]
-    
-    for old, new in replacements:
-        if old.startswith('\\') or old.endswith('\\'):
-            # Regex pattern
-            result = re.sub(old, new, result, flags=re.IGNORECASE)
-        else:
-            # Case-insensitive replace
-            result = re.sub(re.escape(old), new, result, flags=re.IGNORECASE)
-    
-    # Single character mapping
-    mapping = {
-        'a': 'а', 'A': 'А',
-        'b': 'б', 'B': 'Б',
-        'c': 'к', 'C': 'К',  # c -> k sound
-        'd': 'д', 'D': 'Д',
-        'e': 'е', 'E': 'Е',
-        'f': 'ф', 'F': 'Ф',
-        'g': 'г', 'G': 'Г',
-        'h': 'х', 'H': 'Х',
-        'i': 'и', 'I': 'И',
-        'j': 'џ', 'J': 'Џ',  # English j -> dzh sound
-        'k': 'к', 'K': 'К',
-        'l': 'л', 'L': 'Л',
-        'm': 'м', 'M': 'М',
-        'n': 'н', 'N': 'Н',
-        'o': 'о', 'O': 'О',
-        'p': 'п', 'P': 'П',
-        'q': 'к', 'Q': 'К',
-        'r': 'р', 'R': 'Р',
-        's': 'с', 'S': 'С',
-        't': 'т', 'T': 'Т',
-        'u': 'у', 'U': 'У',
-        'v': 'в', 'V': 'В',
-        'w': 'в', 'W': 'В',  # w -> v sound
-        'y': 'ј', 'Y': 'Ј',  # y at start/middle -> j sound
-        'z': 'з', 'Z': 'З',
-    }
-    
-    # Apply single character mapping
-    final_result = []
-    for char in result:
-        final_result.append(mapping.get(char, char))
-    
-    transcribed = ''.join(final_result)
-    
+
+    transcribed = TRANSLITERATOR.replace(text).translate(CHAR_TABLE)
+
     # Capitalize each word in the city name
-    if transcribed:
-        words = transcribed.split()
-        capitalized_words = []
-        for word in words:
-            # Keep special characters, capitalize letters
-            if word and len(word) > 0:
-                # Find first letter
-                first_letter_idx = 0
-                for i, c in enumerate(word):
-                    if c.isalpha():
-                        first_letter_idx = i
-                        break
-                
-                if first_letter_idx == 0:
-                    capitalized_words.append(word[0].upper() + word[1:].lower())
-                else:
-                    # Handle case where word starts with non-letter (e.g., 'o-Mar)
-                    capitalized_words.append(
-                        word[:first_letter_idx] + 
-                        word[first_letter_idx].upper() + 
-                        word[first_letter_idx+1:].lower()
-                    )
-            else:
-                capitalized_words.append(word)
-        
-        transcribed = ' '.join(capitalized_words)
-    
-    return transcribed
+    return ' '.join(capitalize_word(word) for word in transcribed.split())
 
+@lru_cache(maxsize=TRANSLATE_CACHE_SIZE)
 def translate_city(city_name):
     """
     Translate city name to Macedonian (phonetic pronunciation)
@@ -241,38 +314,242 @@ def translate_city(city_name):
     # Otherwise do phonetic transcription
     return phonetic_transcribe(city_name)
 
+class TranslationStore:
+    """
+    Persistent SQLite dictionary of city translations.
+
+    Rows come from three sources, in order of precedence:
+    'override' (manual corrections) > 'seed' (CITY_TRANSLATIONS) > 'computed'
+    (phonetic transcriptions saved by earlier runs). The seed is written
+    when the store is created and again only when SEED_VERSION changes;
+    computed rows are dropped when TRANSCRIPTION_VERSION changes so they
+    never go stale.
+    """
+
+    def __init__(self, path=STORE_FILE):
+        self.path = Path(path)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                name TEXT PRIMARY KEY,
+                translation TEXT NOT NULL,
+                source TEXT NOT NULL
+            )
+        """)
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._check_version()
+        self._check_seed()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def _check_version(self):
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != str(TRANSCRIPTION_VERSION):
+            self.db.execute("DELETE FROM translations WHERE source = 'computed'")
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(TRANSCRIPTION_VERSION),))
+            self.db.commit()
+
+    def _check_seed(self):
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'seed'").fetchone()
+        if row is None or row[0] != str(SEED_VERSION):
+            self.db.execute("DELETE FROM translations WHERE source = 'seed'")
+            self.seed(CITY_TRANSLATIONS)
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('seed', ?)", (str(SEED_VERSION),))
+            self.db.commit()
+
+    def _put(self, items, source):
+        # Overrides are never replaced by seed/computed values
+        self.db.executemany("""
+            INSERT INTO translations (name, translation, source) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET translation = excluded.translation, source = excluded.source
+            WHERE translations.source != 'override' OR excluded.source = 'override'
+        """, ((name, translation, source) for name, translation in items))
+        self.db.commit()
+
+    def seed(self, translations):
+        self._put(translations.items(), 'seed')
+
+    def add_computed(self, translations):
+        self._put(translations.items(), 'computed')
+
+    def set_override(self, name, translation):
+        self._put([(name, translation)], 'override')
+
+    def lookup(self, names):
+        """{name: translation} for the names present in the store"""
+        names = list(names)
+        found = {}
+        for i in range(0, len(names), STORE_BATCH):
+            batch = names[i:i + STORE_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            found.update(self.db.execute(
+                f"SELECT name, translation FROM translations WHERE name IN ({placeholders})", batch
+            ))
+        return found
+
+    def counts(self):
+        """Number of stored translations per source"""
+        return dict(self.db.execute("SELECT source, COUNT(*) FROM translations GROUP BY source"))
+
+def translate_row(row, translations=None):
+    """[guid, city_original, ...] -> [guid, city_original, city_macedonian]"""
+    if len(row) >= 2:
+        city_original = row[1]
+        if translations is not None:
+            return [row[0], city_original, translations[city_original]]
+        return [row[0], city_original, translate_city(city_original)]
+    # Handle case with only GUID
+    return [row[0], '', '']
+
+def translate_batch(names, pool=None, workers=1):
+    """
+    Translate distinct names -> {name: translation}.
+    With a process pool the names are split in chunks across the workers.
+    """
+    names = list(names)
+    if pool is None or len(names) < 2 * workers:
+        return {name: translate_city(name) for name in names}
+    chunksize = max(1, len(names) // (workers * 4))
+    return dict(zip(names, pool.map(translate_city, names, chunksize=chunksize)))
+
+def translate_csv(input_file, output_file=None, delimiter=';', chunk_size=CHUNK_SIZE,
+                  workers=1, store=None, samples=20):
+    """
+    Stream the CSV in chunks. Each chunk is deduplicated: its distinct names
+    are looked up in the store (if given) and the rest are translated and
+    saved back to the store. The process pool (`workers` processes) is only
+    started once a chunk has at least POOL_THRESHOLD names to translate.
+    Only the current chunk's translations are kept, so memory stays bounded
+    by chunk_size; repeats across chunks hit the store or translate_city's LRU.
+    Results are expanded back in the original row order.
+    Output goes to a temporary file next to output_file which is then
+    atomically renamed over it, so the source is never left half-written
+    even when input_file == output_file.
+    Returns (stats, first `samples` translated rows).
+    """
+    output_file = Path(output_file or input_file)
+    # Unique temp file per run, so concurrent runs on the same output don't clash
+    with tempfile.NamedTemporaryFile(dir=output_file.parent, prefix=output_file.name + '.',
+                                     suffix='.tmp', delete=False) as f:
+        tmp_file = Path(f.name)
+
+    stats = {'rows': 0, 'names': 0, 'unique': 0, 'stored': 0, 'seconds': 0.0, 'workers': 1}
+    examples = []
+    started = time.perf_counter()
+    pool = None
+    try:
+        with open(input_file, 'r', encoding='utf-8', newline='') as src, \
+                open(tmp_file, 'w', encoding='utf-8', newline='') as dst:
+            reader = (row for row in csv.reader(src, delimiter=delimiter) if row)
+            writer = csv.writer(dst, delimiter=delimiter)
+            while True:
+                rows = list(islice(reader, chunk_size))
+                if not rows:
+                    break
+
+                names = [row[1] for row in rows if len(row) >= 2]
+                translations = dict.fromkeys(names)
+                missing = list(translations)
+                if store is not None:
+                    stored = store.lookup(missing)
+                    translations.update(stored)
+                    missing = [name for name in missing if name not in stored]
+                    stats['stored'] += len(stored)
+                if pool is None and workers > 1 and len(missing) >= POOL_THRESHOLD:
+                    pool = ProcessPoolExecutor(max_workers=workers)
+                    stats['workers'] = workers
+                computed = translate_batch(missing, pool, workers)
+                translations.update(computed)
+                if store is not None:
+                    store.add_computed(computed)
+
+                chunk = [translate_row(row, translations) for row in rows]
+                writer.writerows(chunk)
+                if len(examples) < samples:
+                    examples.extend(chunk[:samples - len(examples)])
+
+                stats['rows'] += len(rows)
+                stats['names'] += len(names)
+                stats['unique'] += len(translations)
+        if output_file.exists():
+            # NamedTemporaryFile is created 0600; keep the original file's permissions
+            shutil.copymode(output_file, tmp_file)
+        os.replace(tmp_file, output_file)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if tmp_file.exists():
+            tmp_file.unlink()
+
+    stats['seconds'] = time.perf_counter() - started
+    return stats, examples
+
 def main():
-    input_file = 'Cities Prevod.csv'
-    output_file = 'Cities Prevod.csv'
-    
-    # Read the CSV file
-    rows = []
-    with open(input_file, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f, delimiter=';')
-        for row in reader:
-            if len(row) >= 2:
-                guid = row[0]
-                city_original = row[1]
-                city_macedonian = translate_city(city_original)
-                rows.append([guid, city_original, city_macedonian])
-            elif len(row) == 1:
-                # Handle case with only GUID
-                rows.append([row[0], '', ''])
-    
-    # Write back to CSV with new column
-    with open(output_file, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.writer(f, delimiter=';')
-        for row in rows:
-            writer.writerow(row)
-    
-    print(f"✓ Преведени {len(rows)} градови")
+    parser = argparse.ArgumentParser(description='Translate city names in a CSV to Macedonian')
+    parser.add_argument('--input', default='Cities Prevod.csv',
+                        help='input CSV (guid;city_original[;...])')
+    parser.add_argument('--output', default=None,
+                        help='output CSV (default: overwrite the input in place)')
+    parser.add_argument('--delimiter', default=';',
+                        help='CSV delimiter (default: ;)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help='rows translated and written per chunk')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='processes for translating distinct names (default: all cores, '
+                             f'started only for chunks with {POOL_THRESHOLD}+ new names)')
+    parser.add_argument('--store', default=STORE_FILE,
+                        help=f'persistent translation store (default: {STORE_FILE.name})')
+    parser.add_argument('--no-store', action='store_true',
+                        help='translate without reading/writing the store')
+    parser.add_argument('--override', action='append', default=[], metavar='NAME=TRANSLATION',
+                        help='save a manual correction to the store (repeatable)')
+    args = parser.parse_args()
+
+    if args.no_store and args.override:
+        parser.error("--override не може со --no-store (корекциите се чуваат во речникот)")
+
+    output_file = args.output or args.input
+    workers = args.workers or os.cpu_count() or 1
+
+    store = None if args.no_store else TranslationStore(args.store)
+    try:
+        for override in args.override:
+            name, sep, translation = override.partition('=')
+            if not sep or not name:
+                parser.error(f"--override очекува NAME=TRANSLATION: {override}")
+            store.set_override(name, translation)
+            print(f"✓ Рачна корекција: {name} → {translation}")
+
+        stats, examples = translate_csv(args.input, output_file, args.delimiter, args.chunk_size,
+                                        workers, store)
+        counts = store.counts() if store is not None else None
+    finally:
+        if store is not None:
+            store.close()
+
+    ratio = stats['unique'] / stats['names'] if stats['names'] else 0
+    throughput = stats['rows'] / stats['seconds'] if stats['seconds'] else 0
+    print(f"✓ Преведени {stats['rows']} градови")
+    print(f"✓ Уникатни имиња (по chunk): {stats['unique']} од {stats['names']} ({ratio:.1%})")
+    print(f"✓ Брзина: {throughput:,.0f} редови/с ({stats['seconds']:.2f} с, {stats['workers']} процеси)")
+    if counts is not None:
+        print(f"✓ Речник ({store.path.name}): {stats['stored']} пронајдени, "
+              f"{sum(counts.values())} вкупно {counts}")
     print(f"✓ Фајлот е ажуриран: {output_file}")
-    
+
     # Show sample translations
     print("\nПримери на преведени градови:")
-    for i in range(min(20, len(rows))):
-        if rows[i][1]:
-            print(f"  {rows[i][1]} → {rows[i][2]}")
+    for row in examples:
+        if row[1]:
+            print(f"  {row[1]} → {row[2]}")
 
 if __name__ == '__main__':
     main()